@@ -0,0 +1,260 @@
+"""
+Offline benchmark for stock_screener.
+
+Serves the NASDAQ list, prices and fundamentals from a deterministic synthetic market
+with planted Sniper / Golden Cross / Death Cross setups, runs the full scan at several
+universe sizes (each in a fresh subprocess, so peak RSS is per size) and checks that the
+scanner reports exactly the planted setups.
+
+    python benchmark.py                          # 500 / 5,000 / 20,000 tickers
+    python benchmark.py --sizes 500 --workers 4
+    python benchmark.py --stream --memory-mb 384     # memory-bounded mode
+    python benchmark.py --sizes 5000 --shards 4      # 4 shard subprocesses + merge
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+BARS = 255              # ~1 year of sessions, inside the price store's HISTORY_DAYS
+CROSS_OFFSET = 3        # Planted crosses land this many bars before the last one
+
+# --- SYNTHETIC MARKET ---
+class SyntheticMarket:
+    """
+    Deterministic stand-in for Yahoo, nasdaqtrader.com and Wikipedia. Implements the
+    stock_screener data source interface (download / quarterly_financials / fetch_text).
+
+    Background tickers trend smoothly (no crosses, no extension), some are deliberately
+    illiquid, and every PLANT_EVERY-th ticker carries a planted setup.
+    """
+    PLANT_EVERY = 25
+    KINDS = {1: 'sniper', 2: 'golden', 3: 'death', 4: 'penny', 5: 'thin'}
+
+    def __init__(self, n_tickers, seed=7, end=None):
+        self.seed = seed
+        self.tickers = [f"SYN{i:05d}" for i in range(n_tickers)]
+        self.dates = pd.bdate_range(end=end or pd.Timestamp.today().normalize(), periods=BARS)
+
+    def kind(self, ticker):
+        i = int(ticker[3:])
+        return self.KINDS.get(i % self.PLANT_EVERY, 'up' if i % 2 else 'down')
+
+    def expected_results(self):
+        labels = {'sniper': "Sniper (Bear)", 'golden': "Bullish (Confirmed)", 'death': "Bearish (Confirmed)"}
+        return {(t, labels[self.kind(t)]) for t in self.tickers if self.kind(t) in labels}
+
+    def _rng(self, ticker):
+        return np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+
+    def _reversal_closes(self, rng, first, second):
+        """Log-linear leg `first` then `second`, windowed so the SMA50/SMA200 cross is CROSS_OFFSET bars from the end."""
+        n = BARS + 400
+        bottom = 350
+        slope = np.where(np.arange(n) < bottom, first, second)
+        closes = rng.uniform(30, 120) * np.exp(np.cumsum(slope)) * (1 + 0.006 * rng.standard_normal(n))
+        above = pd.Series(closes).rolling(50).mean().to_numpy() > pd.Series(closes).rolling(200).mean().to_numpy()
+        flips = np.flatnonzero(above[bottom:] != above[bottom - 1]) + bottom
+        end = flips[0] + CROSS_OFFSET
+        return closes[end - BARS + 1 : end + 1]
+
+    def prices(self, ticker):
+        rng = self._rng(ticker)
+        kind = self.kind(ticker)
+        t = np.arange(BARS)
+        volume = rng.uniform(2e6, 5e6) * (1 + 0.04 * rng.standard_normal(BARS))
+
+        if kind == 'golden':
+            close = self._reversal_closes(rng, -0.003, 0.005)
+        elif kind == 'death':
+            close = self._reversal_closes(rng, 0.003, -0.005)
+        else:
+            drift = -0.0006 if kind == 'down' else 0.0006
+            base = rng.uniform(1, 4) if kind == 'penny' else rng.uniform(25, 150)
+            close = base * np.exp(drift * t) * (1 + 0.008 * rng.standard_normal(BARS))
+            if kind == 'thin': volume /= 1000
+            if kind == 'sniper':
+                close[-26:] *= np.exp(0.02 * np.arange(1, 27))   # parabolic run-up
+
+        open_ = np.r_[close[0], close[:-1]] * (1 + 0.003 * rng.standard_normal(BARS))
+        if kind == 'sniper':
+            open_[-1] = close[-2] * 0.98                         # gap down ...
+            close[-1] = open_[-1] * 0.985                        # ... closing below the open
+            volume[-1] *= 2.5                                    # on heavy volume
+        high = np.maximum(open_, close) * (1 + np.abs(0.004 * rng.standard_normal(BARS)))
+        low = np.minimum(open_, close) * (1 - np.abs(0.004 * rng.standard_normal(BARS)))
+        return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume.round()},
+                            index=pd.DatetimeIndex(self.dates, name='Date'))
+
+    # Data source interface
+    def download(self, tickers, period=None, start=None, **_):
+        if isinstance(tickers, str): tickers = [tickers]
+        frames = {}
+        for ticker in tickers:
+            df = self.prices(ticker)
+            if start is not None: df = df[df.index >= pd.Timestamp(start)]
+            frames[ticker] = df
+        return pd.concat(frames, axis=1)
+
+    def quarterly_financials(self, ticker):
+        quarters = pd.date_range(end=self.dates[-1], periods=5, freq='QE')[::-1]
+        step = {'golden': 1.05, 'death': 0.95}.get(self.kind(ticker), 1.0)
+        revenue = [1e9 * step ** -k for k in range(len(quarters))]
+        return pd.DataFrame([revenue], index=['Total Revenue'], columns=quarters)
+
+    def fetch_text(self, url, headers=None):
+        if 'nasdaqtrader' in url:
+            rows = [f"{t}|{t} Synthetic Corp|Q|N|N|100|N|N" for t in self.tickers]
+            header = "Symbol|Security Name|Market Category|Test Issue|Financial Status|Round Lot Size|ETF|NextShares"
+            return "\n".join([header, *rows, "File Creation Time: 0000000000|||||||"])
+        rows = "".join(f"<tr><td>{t}</td></tr>" for t in self.tickers)
+        return f"<table><tr><th>Symbol</th></tr>{rows}</table>"
+
+# --- HARNESS ---
+def run_child(size, workers, stream=False, memory_mb=None, shard=None, workdir=None):
+    """
+    Runs one scan against a fresh store and prints a JSON result line. With shard=(I, N)
+    it scans only that shard of the universe into its partial inside workdir.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="screener-bench-")
+    os.environ['SCREENER_CACHE_DIR'] = os.path.join(workdir, "cache")
+    import stock_screener
+
+    market = SyntheticMarket(size, end=stock_screener.expected_last_session())
+    stock_screener.set_data_source(market)
+    stock_screener.YAHOO_LIMITER = stock_screener.TokenBucket(rate=1e9, capacity=1e9)
+    stock_screener.OUTPUT_FILENAME = os.path.join(workdir, "index.html")
+    if shard: stock_screener.use_shard(*shard)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tickers = stock_screener.get_nasdaq_composite_tickers()
+        if shard:
+            tickers = stock_screener.select_shard(tickers, *shard)
+            snapshot = str(stock_screener.expected_last_session().date())
+            sink = stock_screener.ShardSink(*shard, snapshot, len(tickers))
+            cross_section = stock_screener.CrossSection()
+            stock_screener.run_pipeline(tickers, workers=workers, sink=sink, cross_section=cross_section)
+            sink.close(cross_section)
+            with open(sink.path, encoding="utf-8") as f:
+                results = [r for r in map(json.loads, f) if 'Ticker' in r]
+        elif not stream:
+            cross_section = stock_screener.CrossSection()
+            results = stock_screener.run_pipeline(tickers, workers=workers, cross_section=cross_section)
+            cross_section.rank(results)
+            stock_screener.generate_dashboard_file(pd.DataFrame(results))
+        else:
+            stock_screener.PRICE_DTYPE = np.float32
+            batch_size = stock_screener.auto_batch_size(memory_mb or stock_screener.STREAM_MEMORY_MB)
+            sink = stock_screener.ResultSink(os.path.join(workdir, stock_screener.RESULTS_FILENAME))
+            cross_section = stock_screener.CrossSection()
+            stock_screener.run_pipeline(tickers, workers=workers, batch_size=batch_size, sink=sink, cross_section=cross_section)
+            cross_section.rank_file(sink.path)
+            stock_screener.generate_dashboard_file(sink.path)
+            results = pd.read_json(sink.path, lines=True).to_dict('records') if sink.categories else []
+    wall = time.perf_counter() - start
+
+    stages = stock_screener.REPORT.snapshot()['stages']
+    found = {(r['Ticker'], r['Category']) for r in results}
+    expected = {(t, cat) for t, cat in market.expected_results() if t in set(tickers)}
+    print(json.dumps({
+        'size': size,
+        'workers': workers,
+        'wall_s': round(wall, 2),
+        'tickers_per_s': round(len(tickers) / wall, 1),
+        'peak_rss_mb': round(max(stock_screener.peak_rss_mb(), stock_screener.peak_rss_mb(children=True)), 1),
+        'stages_s': {name: round(entry['seconds'], 2) for name, entry in stages.items()},
+        'signals': len(found),
+        'missing': sorted(map(list, expected - found)),
+        'unexpected': sorted(map(list, found - expected)),
+    }))
+
+def run_sharded(size, shards, workers):
+    """Launches every shard as a concurrent subprocess, merges the partials and checks the merged result."""
+    workdir = tempfile.mkdtemp(prefix="screener-bench-")
+    start = time.perf_counter()
+    procs = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', str(size), '--workers', str(workers),
+                               '--shard', f"{index}/{shards}", '--workdir', workdir],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+             for index in range(shards)]
+    outputs = [proc.communicate() for proc in procs]
+    if any(proc.returncode != 0 for proc in procs):
+        return None, "\n".join(err for _, err in outputs)
+    reports = [json.loads(out.strip().splitlines()[-1]) for out, _ in outputs]
+
+    import stock_screener
+    stock_screener.OUTPUT_FILENAME = os.path.join(workdir, "index.html")
+    with contextlib.redirect_stdout(io.StringIO()):
+        merged = stock_screener.merge_partials([stock_screener.shard_path(index, shards) for index in range(shards)])
+        stock_screener.generate_dashboard_file(pd.DataFrame(merged))
+    wall = time.perf_counter() - start
+
+    found = {(r['Ticker'], r['Category']) for r in merged}
+    expected = SyntheticMarket(size).expected_results()
+    return {
+        'wall_s': round(wall, 2),
+        'tickers_per_s': round(size / wall, 1),
+        'peak_rss_mb': max(r['peak_rss_mb'] for r in reports),
+        'stages_s': {f"shard{index}": r['wall_s'] for index, r in enumerate(reports)},
+        'missing': sorted(map(list, expected - found)),
+        'unexpected': sorted(map(list, found - expected)),
+    }, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for stock_screener")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 20000])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--stream', action='store_true', help="benchmark the memory-bounded --stream mode")
+    parser.add_argument('--memory-mb', type=float, default=None, help="memory budget for --stream (default: the scanner's)")
+    parser.add_argument('--shards', type=int, default=None, help="run each size as N concurrent shard subprocesses and merge them")
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--shard', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        shard = tuple(map(int, args.shard.split('/'))) if args.shard else None
+        run_child(args.child, args.workers, args.stream, args.memory_mb, shard, args.workdir)
+        return
+
+    failed = False
+    print(f"{'Tickers':>8} {'Wall s':>8} {'Tick/s':>8} {'RSS MB':>8}  Stage busy time (s)")
+    for size in args.sizes:
+        if args.shards:
+            report, error = run_sharded(size, args.shards, args.workers)
+            if report is None:
+                print(f"{size:>8}  [Error] sharded benchmark run failed:\n{error}")
+                failed = True
+                continue
+            stages = " | ".join(f"{name}: {secs}" for name, secs in report['stages_s'].items())
+            print(f"{size:>8} {report['wall_s']:>8} {report['tickers_per_s']:>8} {report['peak_rss_mb']:>8}  {stages}")
+            if report['missing'] or report['unexpected']:
+                print(f"         [Mismatch] missing={report['missing'][:5]} unexpected={report['unexpected'][:5]}")
+                failed = True
+            continue
+        cmd = [sys.executable, os.path.abspath(__file__), '--child', str(size), '--workers', str(args.workers)]
+        if args.stream: cmd += ['--stream'] + (['--memory-mb', str(args.memory_mb)] if args.memory_mb else [])
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{size:>8}  [Error] benchmark run failed:\n{proc.stderr}")
+            failed = True
+            continue
+        report = json.loads(proc.stdout.strip().splitlines()[-1])
+        stages = " | ".join(f"{name}: {secs}" for name, secs in report['stages_s'].items())
+        print(f"{size:>8} {report['wall_s']:>8} {report['tickers_per_s']:>8} {report['peak_rss_mb']:>8}  {stages}")
+        if report['missing'] or report['unexpected']:
+            print(f"         [Mismatch] missing={report['missing'][:5]} unexpected={report['unexpected'][:5]}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
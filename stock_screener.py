@@ -1,21 +1,79 @@
 import yfinance as yf
 import pandas as pd
+import numpy as np
 import time
-import requests
+import aiohttp
+import asyncio
+import random
+import urllib.parse
 import io
 import datetime
 import concurrent.futures
+import multiprocessing
+from multiprocessing import shared_memory
+import collections
+import threading
+import queue
 import json
 import os
+import sys
+import zlib
+import gzip
+import glob
+import subprocess
+import argparse
 import warnings
+import contextlib
+import cProfile
+import pstats
 
 # --- CONFIGURATION ---
 BATCH_SIZE = 50         
 LOOKBACK_DAYS = 5       
-SLEEP_TIME = 2          
-MAX_WORKERS = 5         
+RATE_LIMIT = 2.0        # Yahoo requests per second, shared by every pipeline stage
+RATE_BURST = 5          # Token bucket capacity
+PIPELINE_DEPTH = 2      # Batches buffered between pipeline stages (backpressure)
+HOST_RATE_LIMIT = 5.0   # Requests per second to each non-Yahoo host (universe lists)
+HTTP_CONCURRENCY = 16   # In-flight HTTP requests / fundamentals lookups
+HTTP_POOL_PER_HOST = 8  # Keep-alive connections per host
+HTTP_TIMEOUT = 30       # Seconds per request
 MAX_RETRIES = 3         
+BACKOFF_BASE = 5.0      # Retry n waits ~BACKOFF_BASE * 2**n seconds, with jitter
+BACKOFF_CAP = 60.0      
+MIN_DOLLAR_VOLUME = 20000000  # SMA50 x VolSMA50 liquidity cutoff
+RANK_TOP_K = 100              # Universe leaders (RS, extension) that get an ordinal rank
+MULTI_TIMEFRAME = True        # Re-check each signal on weekly / monthly bars resampled from the daily ones
+FORWARD_DAYS = (1, 5, 20)     # Forward return horizons reported by --replay
+REPLAY_FILENAME = "signal_history.csv"
 OUTPUT_FILENAME = "index.html" 
+DATA_FILENAME = "dashboard_data.json.gz"  # Columnar dashboard payload, written next to OUTPUT_FILENAME
+DICTIONARY_COLUMNS = ('Category', 'Signal', 'AVWAP_Info', 'Date', 'Timeframes')  # Sent as distinct values + codes
+DASHBOARD_PAGE_SIZE = 100       # Table rows rendered at a time
+RESULTS_FILENAME = "scan_results.jsonl"  # --stream result sink, written next to OUTPUT_FILENAME
+SHARD_FILENAME = "shard-{index}-of-{shards}.jsonl"  # --shard partial results, written next to OUTPUT_FILENAME
+PRICE_DTYPE = np.float64        # Price panel dtype (--stream switches to float32)
+STREAM_MEMORY_MB = 512          # Default --memory-mb budget for --stream
+STREAM_BATCH_LIMITS = (10, 250)   # Bounds for the automatically chosen batch size
+PANEL_COPIES = 8                # Peak copies of a batch's prices (store frames, panel, shared memory, rolling temporaries)
+REPORT_FILENAME = "run_report.json"   # Written next to OUTPUT_FILENAME
+PROFILE_FILENAME = "run_profile.prof" # Written next to OUTPUT_FILENAME with --profile
+CACHE_DIR = os.path.expanduser(os.environ.get("SCREENER_CACHE_DIR", ".screener_cache"))
+PRICE_DIR = os.path.join(CACHE_DIR, "prices")
+HISTORY_DAYS = 365      # Rolling window kept in the price store (matches period="1y")
+ADJUST_TOLERANCE = 1e-4 # Relative change on an overlap bar that signals a split/dividend re-adjustment
+FUNDAMENTALS_FILE = os.path.join(CACHE_DIR, "fundamentals.json")
+FUNDAMENTALS_MAX_ENTRIES = 5000  # LRU bound on cached tickers
+FUNDAMENTALS_QUARTERS = 4        # Quarters of Total Revenue kept per ticker
+REPORT_LAG_DAYS = 20             # Earliest days after a quarter's end that the next quarter is normally reported
+FUNDAMENTALS_MIN_TTL = 3         # Days between re-checks once the next report may be out, until it shows up
+LIQUIDITY_FILE = os.path.join(CACHE_DIR, "liquidity.json")
+LIQUIDITY_MARGIN = 0.5           # Skip only tickers below this fraction of the price / dollar-volume cutoffs
+LIQUIDITY_REVALIDATE_DAYS = 7    # Every skipped ticker is downloaded again at least once per cycle
+INCREMENTAL_INDICATORS = True    # Advance persisted running sums instead of recomputing rolling windows
+INDICATOR_STATE_FILE = os.path.join(CACHE_DIR, "indicator_state.json")
+INDICATOR_RECOMPUTE_EVERY = 20   # O(1) updates before a ticker gets a full recompute + drift check
+INDICATOR_DRIFT_TOLERANCE = 1e-9 # Relative drift reported in the run report
+JOURNAL_FILE = os.path.join(CACHE_DIR, "run_journal.jsonl")  # Completed batches of the current scan (--resume)
 
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
@@ -71,13 +129,18 @@ HTML_TEMPLATE = """
 
         <!-- Filters -->
         <div id="filters-container" class="flex flex-wrap gap-4 mb-6">
-            <input type="text" id="search-input" placeholder="Search Ticker..." class="bg-slate-800 border border-slate-700 rounded px-4 py-2 focus:outline-none focus:border-blue-500 text-sm transition-colors">
+            <input type="text" id="search-input" placeholder="Ticker prefix..." class="bg-slate-800 border border-slate-700 rounded px-4 py-2 focus:outline-none focus:border-blue-500 text-sm transition-colors">
             <select id="category-filter" class="bg-slate-800 border border-slate-700 rounded px-4 py-2 text-sm focus:outline-none hover:bg-slate-700 transition-colors">
                 <option value="all">All Strategies</option>
                 <option value="Sniper">🎯 Sniper (High Conviction)</option>
                 <option value="Bullish">🚀 Bullish Cross</option>
                 <option value="Bearish">📉 Bearish Cross</option>
             </select>
+            <select id="timeframe-filter" class="bg-slate-800 border border-slate-700 rounded px-4 py-2 text-sm focus:outline-none hover:bg-slate-700 transition-colors">
+                <option value="all">Any Timeframe</option>
+                <option value="W">Weekly Agrees</option>
+                <option value="M">Monthly Agrees</option>
+            </select>
         </div>
 
         <!-- Data Table -->
@@ -88,17 +151,28 @@ HTML_TEMPLATE = """
                         <th class="p-4 font-medium">Ticker</th>
                         <th class="p-4 font-medium">Strategy</th>
                         <th class="p-4 font-medium">Signal / Pattern</th>
+                        <th class="p-4 font-medium">Timeframes</th>
                         <th class="p-4 font-medium">Price</th>
+                        <th class="p-4 font-medium">Rank (pct)</th>
                         <th class="p-4 font-medium">Trend Info</th>
                         <th class="p-4 font-medium">Details</th>
                         <th class="p-4 font-medium">Date</th>
                     </tr>
                 </thead>
                 <tbody id="table-body" class="text-sm divide-y divide-slate-700">
-                    <!-- Rows injected via JS -->
+                    <tr><td colspan="9" class="p-8 text-center text-slate-500 italic">Loading...</td></tr>
                 </tbody>
             </table>
         </div>
+
+        <!-- Pager -->
+        <div id="pager" class="flex justify-between items-center mt-4 text-sm text-slate-400">
+            <span id="page-info"></span>
+            <div class="flex gap-2">
+                <button id="prev-page" class="bg-slate-800 border border-slate-700 rounded px-3 py-1 hover:bg-slate-700 transition-colors">Prev</button>
+                <button id="next-page" class="bg-slate-800 border border-slate-700 rounded px-3 py-1 hover:bg-slate-700 transition-colors">Next</button>
+            </div>
+        </div>
         
         <footer class="mt-10 text-center text-slate-600 text-xs">
             Generated by Python Market Scanner
@@ -106,9 +180,10 @@ HTML_TEMPLATE = """
     </div>
 
     <script>
-        // --- DATA INJECTION ---
-        const embeddedData = /* DATA_PLACEHOLDER */;
+        // --- DATA LOADING ---
+        const dataUrl = "/* DATA_URL_PLACEHOLDER */";
         const generatedDate = "/* DATE_PLACEHOLDER */";
+        const pageSize = /* PAGE_SIZE_PLACEHOLDER */;
 
         // --- APP LOGIC ---
         if (typeof lucide !== 'undefined') lucide.createIcons();
@@ -117,50 +192,133 @@ HTML_TEMPLATE = """
         const tableBody = document.getElementById('table-body');
         const searchInput = document.getElementById('search-input');
         const categoryFilter = document.getElementById('category-filter');
+        const timeframeFilter = document.getElementById('timeframe-filter');
+        const pageInfo = document.getElementById('page-info');
+
+        let payload = null;
+        let allRows = [];
+        let selected = [];
+        let page = 0;
+
+        loadPayload().then(data => {
+            payload = data;
+            allRows = Array.from({ length: payload.rows }, (_, i) => i);
+            renderStats();
+            applyFilters();
+        }).catch(err => {
+            tableBody.innerHTML = `<tr><td colspan="9" class="p-8 text-center text-red-400 italic">Could not load ${dataUrl.split('?')[0]} (${err.message}). Open the dashboard over HTTP, e.g. python -m http.server.</td></tr>`;
+        });
+
+        searchInput.addEventListener('input', applyFilters);
+        categoryFilter.addEventListener('change', applyFilters);
+        timeframeFilter.addEventListener('change', applyFilters);
+        document.getElementById('prev-page').addEventListener('click', () => turnPage(-1));
+        document.getElementById('next-page').addEventListener('click', () => turnPage(1));
+
+        async function loadPayload() {
+            const response = await fetch(dataUrl);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const bytes = new Uint8Array(await response.arrayBuffer());
+            // Servers that send Content-Encoding: gzip hand over the JSON already inflated
+            if (bytes[0] !== 0x1f || bytes[1] !== 0x8b) return JSON.parse(new TextDecoder().decode(bytes));
+            const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+            return JSON.parse(await new Response(stream).text());
+        }
+
+        function value(name, i) {
+            const col = payload.columns[name];
+            if (col === undefined) return null;
+            if (Array.isArray(col)) return col[i];
+            return col.codes[i] < 0 ? null : col.values[col.codes[i]];
+        }
 
-        renderStats();
-        renderTable();
+        function rowAt(i) {
+            const row = {};
+            for (const name of Object.keys(payload.columns)) row[name] = value(name, i);
+            return row;
+        }
 
-        searchInput.addEventListener('input', renderTable);
-        categoryFilter.addEventListener('change', renderTable);
+        function categoryRows(key) {
+            return Object.entries(payload.index.category).filter(([name]) => name.includes(key)).flatMap(([, ids]) => ids);
+        }
 
         function renderStats() {
-            document.getElementById('stat-total').textContent = embeddedData.length;
-            
-            const sniper = embeddedData.filter(r => r.Category.includes('Sniper')).length;
-            const bull = embeddedData.filter(r => r.Category.includes('Bullish')).length;
-            const bear = embeddedData.filter(r => r.Category.includes('Bearish')).length;
+            document.getElementById('stat-total').textContent = payload.rows;
+            document.getElementById('stat-sniper').textContent = categoryRows('Sniper').length;
+            document.getElementById('stat-bull').textContent = categoryRows('Bullish').length;
+            document.getElementById('stat-bear').textContent = categoryRows('Bearish').length;
+        }
+
+        // Rows whose ticker starts with q: the 1-2 character prefix range from the index,
+        // narrowed by binary search over the ticker-ordered rows for longer queries.
+        function prefixRows(q) {
+            const range = payload.index.prefix[q.slice(0, 2)];
+            if (!range) return [];
+            const order = payload.index.order;
+            const ticker = k => value('Ticker', order[k]);
+            const bound = (key) => {
+                let lo = range[0], hi = range[1];
+                while (lo < hi) {
+                    const mid = (lo + hi) >> 1;
+                    if (ticker(mid) < key) lo = mid + 1; else hi = mid;
+                }
+                return lo;
+            };
+            return order.slice(bound(q), bound(q + '\\uffff'));
+        }
+
+        function applyFilters() {
+            if (!payload) return;
+            const q = searchInput.value.trim().toUpperCase();
+            const sets = [];
+            if (q) sets.push(prefixRows(q));
+            if (categoryFilter.value !== 'all') sets.push(categoryRows(categoryFilter.value));
+            if (timeframeFilter.value !== 'all') sets.push(payload.index.timeframe[timeframeFilter.value] || []);
+
+            if (!sets.length) {
+                selected = allRows;
+            } else {
+                // Intersect the index lists: a row survives if every list marked it
+                const marks = new Uint8Array(payload.rows);
+                sets.forEach((ids, k) => { for (const i of ids) if (marks[i] === k) marks[i] = k + 1; });
+                selected = allRows.filter(i => marks[i] === sets.length);
+            }
+            page = 0;
+            renderTable();
+        }
 
-            document.getElementById('stat-sniper').textContent = sniper;
-            document.getElementById('stat-bull').textContent = bull;
-            document.getElementById('stat-bear').textContent = bear;
+        function turnPage(step) {
+            const pages = Math.max(1, Math.ceil(selected.length / pageSize));
+            page = Math.min(pages - 1, Math.max(0, page + step));
+            renderTable();
         }
 
         function renderTable() {
-            const searchTerm = searchInput.value.toLowerCase();
-            const catFilter = categoryFilter.value;
-
-            const filtered = embeddedData.filter(row => {
-                const matchesSearch = row.Ticker.toLowerCase().includes(searchTerm);
-                let matchesCat = true;
-                if (catFilter !== 'all') {
-                    matchesCat = row.Category.includes(catFilter);
-                }
-                return matchesSearch && matchesCat;
-            });
+            const first = page * pageSize;
+            const visible = selected.slice(first, first + pageSize);
+            pageInfo.textContent = selected.length
+                ? `${first + 1}–${first + visible.length} of ${selected.length}`
+                : '0 of 0';
 
-            if (filtered.length === 0) {
-                tableBody.innerHTML = '<tr><td colspan="7" class="p-8 text-center text-slate-500 italic">No matches found.</td></tr>';
+            if (visible.length === 0) {
+                tableBody.innerHTML = '<tr><td colspan="9" class="p-8 text-center text-slate-500 italic">No matches found.</td></tr>';
                 return;
             }
 
-            tableBody.innerHTML = filtered.map(row => {
+            tableBody.innerHTML = visible.map(rowAt).map(row => {
                 let badgeClass = "bg-slate-700 text-slate-300";
                 if (row.Category.includes('Bullish')) badgeClass = "bg-emerald-900/50 text-emerald-400 border border-emerald-700";
                 if (row.Category.includes('Bearish')) badgeClass = "bg-red-900/50 text-red-400 border border-red-700";
                 if (row.Category.includes('Sniper')) badgeClass = "bg-purple-900/50 text-purple-400 border border-purple-700";
 
                 const tvLink = `https://www.tradingview.com/chart/?symbol=${row.Ticker}`;
+                const agreeing = (row.Timeframes || 'D').split(' ');
+                const tfBadges = ['D', 'W', 'M'].map(tf => agreeing.includes(tf)
+                    ? `<span class="px-1.5 py-0.5 rounded text-xs font-mono bg-blue-900/50 text-blue-300 border border-blue-700">${tf}</span>`
+                    : `<span class="px-1.5 py-0.5 rounded text-xs font-mono text-slate-600 border border-slate-700">${tf}</span>`).join(' ');
+                const pct = v => (v === null || v === undefined) ? '–' : v;
+                const leader = row.RS_Top ? ` <span class="px-1.5 py-0.5 rounded text-xs bg-amber-900/50 text-amber-300 border border-amber-700">#${row.RS_Top}</span>` : '';
+                const rankTitle = `RS 3M ${pct(row.RS_3M)} | 6M ${pct(row.RS_6M)} | 12M ${pct(row.RS_12M)}` + (row.Ext_Top ? ` | #${row.Ext_Top} most extended` : '');
 
                 return `
                     <tr class="hover:bg-slate-700/50 transition-colors group">
@@ -172,7 +330,12 @@ HTML_TEMPLATE = """
                         </td>
                         <td class="p-4"><span class="px-2 py-1 rounded text-xs font-medium ${badgeClass}">${row.Category}</span></td>
                         <td class="p-4 font-mono text-slate-300">${row.Signal}</td>
+                        <td class="p-4 whitespace-nowrap">${tfBadges}</td>
                         <td class="p-4 font-mono text-white">$${row.Price}</td>
+                        <td class="p-4 whitespace-nowrap text-xs text-slate-400" title="${rankTitle}">
+                            <span class="font-mono text-sm text-white">RS ${pct(row.RS)}</span>${leader}
+                            <div class="mt-1 font-mono">Vol ${pct(row.RelVol_Pct)} · Ext ${pct(row.Ext_Pct)}</div>
+                        </td>
                         <td class="p-4 text-slate-400">${row.AVWAP_Info}</td>
                         <td class="p-4 text-slate-400 text-xs max-w-xs truncate" title="${row.Details}">${row.Details}</td>
                         <td class="p-4 text-slate-500">${row.Date}</td>
@@ -213,17 +376,264 @@ def calculate_anchored_vwap(df):
         latest_avwap = subset['AVWAP'].iloc[-1]
         anchor_date = max_vol_idx.date()
         return latest_avwap, str(anchor_date)
-    except Exception:
+    except Exception as e:
+        REPORT.error('avwap', e)
         return None, None
 
+def load_json_cache(path):
+    """Contents of a JSON cache file, or {} if it is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_json_cache(path, data):
+    """Writes a JSON cache file through a temp file, so a killed run never leaves it torn."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+# --- RATE LIMITING ---
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() takes the tokens immediately (the balance may go
+    negative) and returns the wait, so sync and async callers queue up in arrival order.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, tokens=1):
+        time.sleep(self.reserve(tokens))
+
+    async def acquire_async(self, tokens=1):
+        await asyncio.sleep(self.reserve(tokens))
+
+YAHOO_LIMITER = TokenBucket(RATE_LIMIT, RATE_BURST)
+YAHOO_HOST = "query2.finance.yahoo.com"
+_host_limiters = {}
+
+def host_limiter(host):
+    """Yahoo hosts share YAHOO_LIMITER; every other host gets its own bucket. Event loop thread only."""
+    if host.endswith("yahoo.com"): return YAHOO_LIMITER
+    if host not in _host_limiters: _host_limiters[host] = TokenBucket(HOST_RATE_LIMIT, RATE_BURST)
+    return _host_limiters[host]
+
+def backoff_delay(attempt):
+    """Exponential backoff with equal jitter, so retries from parallel callers spread out."""
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+# --- RUN REPORT ---
+class RunReport:
+    """
+    Thread-safe instrumentation for one run: wall time and call count per stage, named
+    counters (filter funnel, cache hits) and swallowed errors by stage and type.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profilers = None   # List of cProfile.Profile when --profile is on
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.stages = {}
+        self.counters = collections.Counter()
+        self.errors = collections.Counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+                entry['seconds'] += elapsed
+                entry['calls'] += 1
+
+    def count(self, name, n=1):
+        with self.lock: self.counters[name] += int(n)
+
+    def error(self, stage, exc):
+        with self.lock: self.errors[f"{stage}: {type(exc).__name__}"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {'stages': {k: dict(v) for k, v in self.stages.items()},
+                    'counters': dict(self.counters), 'errors': dict(self.errors)}
+
+    def merge(self, snapshot):
+        """Folds in a snapshot taken in a worker process."""
+        with self.lock:
+            for name, entry in snapshot['stages'].items():
+                mine = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+                mine['seconds'] += entry['seconds']
+                mine['calls'] += entry['calls']
+            self.counters.update(snapshot['counters'])
+            self.errors.update(snapshot['errors'])
+
+    def start_profiler(self):
+        """Profiles the calling thread if profiling is enabled (each pipeline thread calls this)."""
+        if self.profilers is None: return None
+        with self.lock:
+            # From Python 3.12 one profiler sees every thread, and a second one raises ValueError
+            if sys.version_info >= (3, 12) and self.profilers: return None
+            profiler = cProfile.Profile()
+            self.profilers.append(profiler)
+        profiler.enable()
+        return profiler
+
+REPORT = RunReport()
+
+# --- ASYNC HTTP ---
+class AsyncHTTP:
+    """
+    Shared asyncio loop on a daemon thread with a keep-alive aiohttp pool and a concurrency bound.
+    Blocking calls (yfinance has no async API) run on worker threads; sync code submits with run().
+    """
+    def __init__(self, concurrency=HTTP_CONCURRENCY):
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        self.loop = None
+        self.thread = None
+        self.session = None
+
+    def _ensure_loop(self):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(self.concurrency, thread_name_prefix='http'))
+                self.semaphore = asyncio.Semaphore(self.concurrency)
+                self.thread = threading.Thread(target=self.loop.run_forever, daemon=True, name='http-loop')
+                self.thread.start()
+            return self.loop
+
+    def run(self, coro):
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            while not future.done():
+                concurrent.futures.wait([future], timeout=0.5)   # Short waits keep Ctrl-C responsive
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def _session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=HTTP_POOL_PER_HOST, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+        return self.session
+
+    async def get_text(self, url, headers=None):
+        """GET through the shared pool. 429s, 5xx and connection errors are retried with jittered backoff."""
+        limiter = host_limiter(urllib.parse.urlsplit(url).hostname)
+        for attempt in range(MAX_RETRIES):
+            await limiter.acquire_async()
+            try:
+                async with self.semaphore:
+                    async with self._session().get(url, headers=headers) as response:
+                        response.raise_for_status()
+                        return await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = getattr(e, 'status', None)
+                if (status is not None and status != 429 and status < 500) or attempt + 1 == MAX_RETRIES: raise
+                REPORT.error('http', e)
+                await asyncio.sleep(backoff_delay(attempt))
+
+    async def offload(self, host, fn, *args):
+        """Runs blocking fn(*args) on a worker thread under host's rate limit and the concurrency bound."""
+        await host_limiter(host).acquire_async()
+        async with self.semaphore:
+            return await asyncio.to_thread(fn, *args)
+
+    async def _aclose(self):
+        if self.session is not None: await self.session.close()
+        self.session = None
+        await self.loop.shutdown_default_executor()
+
+    def close(self):
+        """Closes the pool and stops the loop; the next run() starts a fresh one."""
+        if self.loop is None: return
+        self.run(self._aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+
+HTTP = AsyncHTTP()
+
+def _report_path(filename):
+    return os.path.join(os.path.dirname(OUTPUT_FILENAME) or ".", filename)
+
+def write_run_report(**extra):
+    """Writes REPORT as JSON next to the dashboard (plus the merged cProfile stats with --profile)."""
+    snapshot = REPORT.snapshot()
+    report = {
+        'started': datetime.datetime.fromtimestamp(REPORT.started).isoformat(timespec='seconds'),
+        'wall_seconds': round(time.time() - REPORT.started, 3),
+        **extra,
+        'stages': {k: {'seconds': round(v['seconds'], 3), 'calls': v['calls']}
+                   for k, v in sorted(snapshot['stages'].items(), key=lambda kv: -kv[1]['seconds'])},
+        'counters': dict(sorted(snapshot['counters'].items())),
+        'errors': dict(sorted(snapshot['errors'].items())),
+        'price_store': dict(STORE_STATS),
+        'fundamentals_cache': dict(FUNDAMENTALS_STATS),
+    }
+    with open(_report_path(REPORT_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Run report: {_report_path(REPORT_FILENAME)}")
+
+    if REPORT.profilers:
+        for profiler in REPORT.profilers: profiler.disable()
+        stats = pstats.Stats(*REPORT.profilers)
+        stats.dump_stats(_report_path(PROFILE_FILENAME))
+        stats.sort_stats('cumulative').print_stats(25)
+
+# --- DATA SOURCE ---
+class YahooDataSource:
+    """
+    Every network read the scanner makes goes through the active data source, so an
+    offline stand-in (see benchmark.py) can be installed with set_data_source().
+    """
+    def download(self, tickers, **window):
+        """Daily OHLCV grouped by ticker; window is period=... or start=..."""
+        return yf.download(tickers, group_by='ticker', progress=False, threads=True, auto_adjust=True, **window)
+
+    def quarterly_financials(self, ticker):
+        return yf.Ticker(ticker).quarterly_financials
+
+    def fetch_text(self, url, headers=None):
+        return HTTP.run(HTTP.get_text(url, headers=headers))
+
+DATA_SOURCE = YahooDataSource()
+
+def set_data_source(source):
+    global DATA_SOURCE
+    DATA_SOURCE = source
+
 # --- TICKER FETCHING ---
+@REPORT.stage('fetch_universe')
 def get_nasdaq_composite_tickers():
     print("Fetching NASDAQ Composite list...")
     url = "https://www.nasdaqtrader.com/dynamic/symdir/nasdaqlisted.txt"
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status() # Check for errors
-        df = pd.read_csv(io.StringIO(response.text), sep='|')
+        df = pd.read_csv(io.StringIO(DATA_SOURCE.fetch_text(url)), sep='|')
         if 'Test Issue' in df.columns: df = df[df['Test Issue'] == 'N']
         df = df.dropna(subset=['Symbol'])
         df = df[~df['Symbol'].astype(str).str.contains('File Creation')]
@@ -232,15 +642,13 @@ def get_nasdaq_composite_tickers():
         print(f"   [Error] Failed to fetch NASDAQ Composite: {e}")
         return []
 
+@REPORT.stage('fetch_universe')
 def get_sp500_tickers():
     print("Fetching S&P 500 list...")
     url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        tables = pd.read_html(io.StringIO(response.text))
+        tables = pd.read_html(io.StringIO(DATA_SOURCE.fetch_text(url, headers=headers)))
         target_df = next((t for t in tables if 'Symbol' in t.columns or 'Ticker symbol' in t.columns), None)
         
         if target_df is None:
@@ -260,22 +668,80 @@ def get_sp500_tickers():
         return []
 
 # --- FUNDAMENTAL CHECK ---
-def check_fundamentals(ticker, mode):
-    try:
-        time.sleep(0.5) 
-        stock = yf.Ticker(ticker)
-        fin = stock.quarterly_financials
-        if fin.empty: return False, "No Data"
-        fin = fin.T 
+FUNDAMENTALS_STATS = {'hit': 0, 'miss': 0}
+_fundamentals_cache = None
+_fundamentals_dirty = False
+_fundamentals_lock = threading.Lock()
+
+def _load_fundamentals_cache():
+    global _fundamentals_cache
+    if _fundamentals_cache is None:
+        _fundamentals_cache = collections.OrderedDict(load_json_cache(FUNDAMENTALS_FILE))
+    return _fundamentals_cache
+
+def save_fundamentals_cache():
+    """Writes the fundamentals cache, evicting least recently used tickers over the size bound."""
+    global _fundamentals_dirty
+    with _fundamentals_lock:
+        if not _fundamentals_dirty: return
+        cache = _load_fundamentals_cache()
+        while len(cache) > FUNDAMENTALS_MAX_ENTRIES: cache.popitem(last=False)
+        save_json_cache(FUNDAMENTALS_FILE, cache)
+        _fundamentals_dirty = False
+
+def fetch_revenue_history(ticker):
+    """Downloads quarterly financials and returns the cache record for ticker (blocking; see HTTP.offload)."""
+    fin = DATA_SOURCE.quarterly_financials(ticker)
+    today = pd.Timestamp.today().normalize()
+    record = {'quarters': 0, 'revenue': None, 'last_quarter': None}
+    expires = today + pd.Timedelta(days=7)
+
+    if not fin.empty:
+        fin = fin.T
         fin.sort_index(ascending=False, inplace=True)
         fin = fin[~fin.index.duplicated(keep='first')]
-        if len(fin) < 3: return False, "Insufficient Qs"
+        record['quarters'] = len(fin)
+        if 'Total Revenue' in fin.columns:
+            revenue = fin['Total Revenue'].iloc[:FUNDAMENTALS_QUARTERS]
+            record['revenue'] = [None if pd.isna(r) else float(r) for r in revenue]
+        # Nothing changes until the next quarter can be reported; re-checked every few days after that
+        last_quarter = pd.Timestamp(fin.index[0])
+        record['last_quarter'] = str(last_quarter.date())
+        next_report = last_quarter + pd.DateOffset(months=3) + pd.Timedelta(days=REPORT_LAG_DAYS)
+        expires = max(next_report, today + pd.Timedelta(days=FUNDAMENTALS_MIN_TTL))
 
-        try:
-            r0 = fin['Total Revenue'].iloc[0]
-            r1 = fin['Total Revenue'].iloc[1]
-            r2 = fin['Total Revenue'].iloc[2]
-        except: return False, "Rev Missing"
+    record['expires'] = str(expires.date())
+    return record
+
+async def get_revenue_history(ticker):
+    """Serves the revenue record from the on-disk cache, only calling yfinance when it expired."""
+    global _fundamentals_dirty
+    today = str(datetime.date.today())
+    with _fundamentals_lock:
+        cache = _load_fundamentals_cache()
+        record = cache.get(ticker)
+        if record is not None and record['expires'] > today:
+            cache.move_to_end(ticker)
+            FUNDAMENTALS_STATS['hit'] += 1
+            return record
+
+    record = await HTTP.offload(YAHOO_HOST, fetch_revenue_history, ticker)
+    with _fundamentals_lock:
+        cache[ticker] = record
+        cache.move_to_end(ticker)
+        FUNDAMENTALS_STATS['miss'] += 1
+        _fundamentals_dirty = True
+    return record
+
+async def check_fundamentals(ticker, mode):
+    try:
+        with REPORT.stage('fundamentals'):
+            record = await get_revenue_history(ticker)
+        if record['quarters'] == 0: return False, "No Data"
+        if record['quarters'] < 3: return False, "Insufficient Qs"
+        if record['revenue'] is None: return False, "Rev Missing"
+
+        r0, r1, r2 = (np.nan if r is None else r for r in record['revenue'][:3])
 
         if mode == 'bullish':
             if not (r0 > r1 and r1 > r2): return False, "Rev Not Growing"
@@ -283,156 +749,1397 @@ def check_fundamentals(ticker, mode):
             if not (r0 < r1 and r1 < r2): return False, "Rev Not Declining"
             
         return True, "Passed"
-    except Exception as e: return False, str(e)
+    except Exception as e:
+        REPORT.error('fundamentals', e)
+        return False, str(e)
+
+# --- PRICE STORE ---
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+STORE_STATS = {'hit': 0, 'delta': 0, 'full': 0, 'readjusted': 0, 'failed': 0}
+
+def _price_path(ticker):
+    return os.path.join(PRICE_DIR, f"{ticker}.parquet")
+
+def load_cached_prices(ticker):
+    path = _price_path(ticker)
+    if not os.path.exists(path): return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        REPORT.error('price_store', e)
+        return None
+
+def save_cached_prices(ticker, df):
+    os.makedirs(PRICE_DIR, exist_ok=True)
+    tmp_path = _price_path(ticker) + ".tmp"
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, _price_path(ticker))
+
+def expected_last_session():
+    """Date of the newest complete daily bar (today after the US close, else the previous weekday)."""
+    now = pd.Timestamp.now(tz='America/New_York')
+    day = now.normalize().tz_localize(None)
+    if now.weekday() >= 5 or now.hour < 17:
+        day -= pd.tseries.offsets.BDay(1)
+    return day
+
+def split_download(data, tickers):
+    """Splits a grouped yf.download frame into clean per-ticker OHLCV frames."""
+    frames = {}
+    if data is None or data.empty: return frames
+    for ticker in tickers:
+        if isinstance(data.columns, pd.MultiIndex):
+            if ticker not in data.columns.get_level_values(0): continue
+            df = data[ticker]
+        elif len(tickers) == 1:
+            df = data
+        else:
+            continue
+        df = df[[c for c in PRICE_FIELDS if c in df.columns]].dropna(how='all')
+        if df.empty: continue
+        if df.index.tz is not None: df.index = df.index.tz_localize(None)
+        frames[ticker] = df
+    return frames
+
+# --- LIQUIDITY INDEX ---
+_liquidity_index = None
+_liquidity_lock = threading.Lock()
+
+def _load_liquidity_index():
+    global _liquidity_index
+    if _liquidity_index is None:
+        _liquidity_index = load_json_cache(LIQUIDITY_FILE)
+    return _liquidity_index
+
+def save_liquidity_index():
+    with _liquidity_lock:
+        if _liquidity_index is None: return
+        save_json_cache(LIQUIDITY_FILE, _liquidity_index)
+
+def update_liquidity_index(panel):
+    """Records last close, 50-day average dollar volume (SMA50 x VolSMA50) and bar count per ticker."""
+    today = str(datetime.date.today())
+    close = panel['Close'][-1] if len(panel['Close']) else np.full(len(panel['tickers']), np.nan)
+    dollar_volume = np.full(len(panel['tickers']), np.nan)
+    if len(panel['Close']) >= 50:
+        dollar_volume = panel['Close'][-50:].mean(axis=0) * panel['Volume'][-50:].mean(axis=0)
+
+    with _liquidity_lock:
+        index = _load_liquidity_index()
+        for j, ticker in enumerate(panel['tickers']):
+            index[ticker] = {
+                'close': None if np.isnan(close[j]) else round(float(close[j]), 4),
+                'dollar_volume': None if np.isnan(dollar_volume[j]) else round(float(dollar_volume[j])),
+                'bars': int(panel['counts'][j]),
+                'updated': today,
+            }
+
+def _liquidity_skip(ticker, entry, today):
+    """True if the recorded metrics are far enough below the cutoffs that the ticker cannot pass today."""
+    updated = datetime.date.fromisoformat(entry['updated'])
+    age = (today - updated).days
+    if age >= LIQUIDITY_REVALIDATE_DAYS: return False
+    # Staggered re-validation: each ticker gets a fresh download on its own day of the cycle
+    if (today.toordinal() + zlib.crc32(ticker.encode())) % LIQUIDITY_REVALIDATE_DAYS == 0: return False
+    # No bars may just mean a failed download, which says nothing about liquidity
+    if entry['bars'] == 0 or entry['close'] is None: return False
+
+    if entry['close'] is not None and entry['close'] <= 5 * LIQUIDITY_MARGIN: return True
+    if entry['dollar_volume'] is not None and entry['dollar_volume'] < MIN_DOLLAR_VOLUME * LIQUIDITY_MARGIN: return True
+    # Not enough history for SMA50 yet, even counting the sessions since the last check
+    return entry['bars'] + np.busday_count(updated, today) < 50
+
+def prefilter_liquidity(tickers, exempt=()):
+    """Drops tickers the liquidity index marks as clearly illiquid (other than `exempt`), so they are never downloaded."""
+    today = datetime.date.today()
+    with _liquidity_lock:
+        index = _load_liquidity_index()
+        keep = [t for t in tickers if t in exempt or t not in index or not _liquidity_skip(t, index[t], today)]
+    skipped = len(tickers) - len(keep)
+    REPORT.count('prefilter_skipped', skipped)
+    if skipped: print(f"Liquidity index: skipping {skipped} of {len(tickers)} illiquid tickers")
+    return keep
 
 # --- BATCH ANALYZER ---
-def download_data_with_retry(tickers):
+def download_data_with_retry(tickers, start=None):
+    window = {'start': start} if start is not None else {'period': "1y"}
     for attempt in range(MAX_RETRIES):
         try:
-            data = yf.download(tickers, period="1y", group_by='ticker', progress=False, threads=True, auto_adjust=True)
+            YAHOO_LIMITER.acquire()
+            REPORT.count('download_attempts')
+            with REPORT.stage('download'):
+                data = DATA_SOURCE.download(tickers, **window)
             return data
-        except Exception:
-            time.sleep(10 * (attempt + 1))
+        except Exception as e:
+            REPORT.error('download', e)
+            if attempt + 1 < MAX_RETRIES:
+                with REPORT.stage('download_backoff'):
+                    time.sleep(backoff_delay(attempt))
+    REPORT.count('download_gave_up')
     return pd.DataFrame()
 
-def analyze_batch(tickers):
+@REPORT.stage('price_store')
+def load_batch_data(tickers):
+    """
+    Batch frame shaped like yf.download, served from the price store: only missing bars are
+    downloaded, and tickers Yahoo re-adjusted (split/dividend) are re-fetched in full.
+    """
+    target = expected_last_session()
+    frames, stale, full = {}, {}, []
+
+    for ticker in tickers:
+        cached = load_cached_prices(ticker)
+        if cached is None or len(cached) < 2: full.append(ticker)
+        elif cached.index[-1] >= target:
+            frames[ticker] = cached
+            STORE_STATS['hit'] += 1
+        else: stale[ticker] = cached
+
+    # Re-fetch from the second-to-last cached bar: that bar is complete, so any
+    # difference against the cache means the history was re-adjusted.
+    by_start = {}
+    for ticker, cached in stale.items():
+        by_start.setdefault(cached.index[-2], []).append(ticker)
+
+    for start, group in by_start.items():
+        fresh = split_download(download_data_with_retry(group, start=start.strftime('%Y-%m-%d')), group)
+        for ticker in group:
+            cached, new = stale[ticker], fresh.get(ticker)
+            if new is None or start not in new.index:
+                STORE_STATS['failed'] += 1
+                continue
+            old_close, new_close = cached.at[start, 'Close'], new.at[start, 'Close']
+            if abs(new_close - old_close) > ADJUST_TOLERANCE * abs(old_close):
+                STORE_STATS['readjusted'] += 1
+                full.append(ticker)
+                continue
+            frames[ticker] = pd.concat([cached[cached.index < start], new])
+            STORE_STATS['delta'] += 1
+
+    if full:
+        fresh = split_download(download_data_with_retry(full), full)
+        for ticker in full:
+            if ticker in fresh:
+                frames[ticker] = fresh[ticker]
+                STORE_STATS['full'] += 1
+            else:
+                STORE_STATS['failed'] += 1
+
+    # Bars after the target session are still trading; keep them out of the store and the scan
+    cutoff = pd.Timestamp.today().normalize() - pd.Timedelta(days=HISTORY_DAYS)
+    for ticker in frames:
+        df = frames[ticker]
+        df = df[(df.index >= cutoff) & (df.index <= target)]
+        if ticker in stale or ticker in full: save_cached_prices(ticker, df)
+        frames[ticker] = df
+
+    ordered = {t: frames[t].astype(PRICE_DTYPE, copy=False) for t in tickers if t in frames and not frames[t].empty}
+    if not ordered: return pd.DataFrame()
+    return pd.concat(ordered, axis=1, sort=True)
+
+# --- VECTORIZED ENGINE ---
+def align_price_arrays(data, tickers):
+    """
+    Packs a batch frame into dates x tickers arrays, one per OHLCV field. Columns are
+    right-aligned onto each ticker's own trading days, so row -1 is every ticker's latest
+    bar exactly as `data[ticker].dropna(how='all')` would see it.
+    """
+    present = [t for t in tickers if t in data.columns.get_level_values(0)]
+    fields = data.columns.get_level_values(1)
+    T, N = len(data.index), len(present)
+    panel = {'tickers': present, 'dates': data.index}
+    for field in PRICE_FIELDS:
+        if field in fields:
+            panel[field] = data.xs(field, axis=1, level=1).reindex(columns=present).to_numpy(dtype=PRICE_DTYPE, copy=True)
+        else:
+            panel[field] = np.full((T, N), np.nan, dtype=PRICE_DTYPE)
+    return right_align(panel)
+
+def right_align(panel):
+    """Adds 'rows' (each cell's row in panel['dates'], -1 for none) and 'counts' to a calendar-aligned panel."""
+    T, N = panel['Close'].shape
+    valid = ~np.all([np.isnan(panel[f]) for f in PRICE_FIELDS], axis=0)
+    counts = valid.sum(axis=0)
+    rows = np.broadcast_to(np.arange(T)[:, None], (T, N)).copy()
+
+    # Tickers with gaps (halts) or stale endings get their bars shifted down so the
+    # rolling windows see the same sequence as the per-ticker frame would.
+    aligned = valid[-1] & (counts == T - valid.argmax(axis=0)) if T else np.zeros(N, dtype=bool)
+    for j in np.flatnonzero(~aligned & (counts > 0)):
+        keep = np.flatnonzero(valid[:, j])
+        for field in PRICE_FIELDS:
+            col = panel[field][keep, j]
+            panel[field][:, j] = np.nan
+            panel[field][T - len(keep):, j] = col
+        rows[:, j] = -1
+        rows[T - len(keep):, j] = keep
+
+    panel['rows'] = rows
+    panel['counts'] = counts
+    return panel
+
+# Indicators are named after their daily windows; other timeframes pass their own (TIMEFRAMES)
+INDICATOR_WINDOWS = {'SMA50': 50, 'SMA200': 200, 'VolSMA50': 50, 'RSI': 14, 'BB_Upper': 20}
+INDICATORS = {
+    'SMA50': lambda close, volume, n: get_sma(close, n),
+    'SMA200': lambda close, volume, n: get_sma(close, n),
+    'VolSMA50': lambda close, volume, n: get_sma(volume, n),
+    'RSI': lambda close, volume, n: get_rsi(close, n),
+    'BB_Upper': lambda close, volume, n: close.rolling(window=n).mean() + 2 * close.rolling(window=n).std(),
+}
+
+@REPORT.stage('indicators')
+def compute_indicator_arrays(panel, names=INDICATORS, windows=INDICATOR_WINDOWS):
+    """Computes the named indicators for every column of the panel, one rolling pass each."""
+    close = pd.DataFrame(panel['Close'], copy=False)
+    volume = pd.DataFrame(panel['Volume'], copy=False)
+    return {name: INDICATORS[name](close, volume, windows[name]).to_numpy() for name in names}
+
+class LazyIndicators:
+    """
+    Per-ticker memo of indicator arrays over a panel, holding the last `rows` rows.
+    require() computes an indicator only for the columns that don't have it yet, so a
+    ticker the cheap filters reject never pays for the expensive indicators.
+    """
+    def __init__(self, panel, rows=LOOKBACK_DAYS + 1, state=None, windows=INDICATOR_WINDOWS):
+        self.panel = panel
+        self.rows = min(rows, len(panel['Close']))
+        self.windows = windows
+        self.values, self.have = state if state is not None else ({}, {})
+
+    def _slot(self, name):
+        if name not in self.values:
+            N = self.panel['Close'].shape[1]
+            self.values[name] = np.full((self.rows, N), np.nan)
+            self.have[name] = np.zeros(N, dtype=bool)
+        return self.values[name], self.have[name]
+
+    def provide(self, name, mask, values):
+        """Stores values (rows x N) for the masked columns, e.g. from the incremental state."""
+        target, have = self._slot(name)
+        target[:, mask] = values[-self.rows:, mask]
+        have |= mask
+
+    def require(self, names, cols):
+        cols = np.unique(cols)
+        for name in names:
+            target, have = self._slot(name)
+            missing = cols[~have[cols]]
+            if not len(missing): continue
+            computed = compute_indicator_arrays({f: self.panel[f][:, missing] for f in ('Close', 'Volume')}, [name], self.windows)
+            target[:, missing] = computed[name][-self.rows:]
+            have[missing] = True
+            REPORT.count(f'computed_{name}', len(missing))
+
+    def state(self, lo, hi):
+        """Columns lo:hi of the memo, for handing a shard to a worker process."""
+        return ({k: v[:, lo:hi] for k, v in self.values.items()}, {k: v[lo:hi] for k, v in self.have.items()})
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+def ticker_frame(panel, j):
+    """Rebuilds the per-ticker OHLCV frame for column j of a panel."""
+    rows = panel['rows'][:, j]
+    mask = rows >= 0
+    return pd.DataFrame({f: panel[f][mask, j] for f in PRICE_FIELDS}, index=panel['dates'][rows[mask]])
+
+# --- STRATEGY REGISTRY ---
+class ScanContext:
+    """
+    The cells (row t, column j) the strategies are evaluated on: the latest bar of every
+    ticker in the live scan, every bar in the replay. Filters get it narrowed to the cells
+    still alive and read prices and indicators elementwise, `back` bars before each cell.
+    """
+    def __init__(self, panel, ind, t, j, lookback=LOOKBACK_DAYS, min_dollar_volume=MIN_DOLLAR_VOLUME):
+        self.panel, self.ind, self.t, self.j = panel, ind, t, j
+        self.lookback = lookback
+        self.min_dollar_volume = min_dollar_volume
+        self.first = len(panel['Close']) - panel['counts'][j]   # Row of each cell's first bar
+
+    def select(self, mask):
+        return ScanContext(self.panel, self.ind, self.t[mask], self.j[mask], self.lookback, self.min_dollar_volume)
+
+    def __len__(self):
+        return len(self.t)
+
+    def bar(self, field, back=0):
+        return self.panel[field][self.t - back, self.j]
+
+    def has_bar(self, back):
+        return self.t - back >= self.first
+
+    def indicator(self, name, back=0):
+        values = self.ind[name]
+        return values[self.t - back - (len(self.panel['Close']) - len(values)), self.j]
+
+    def window(self, name):
+        """The indicator over the last `lookback` + 1 bars, oldest first (one row per bar)."""
+        return np.stack([self.indicator(name, back) for back in range(self.lookback, -1, -1)])
+
+    def date(self):
+        return self.panel['dates'][self.panel['rows'][self.t, self.j]]
+
+    def tickers(self):
+        return np.asarray(self.panel['tickers'], dtype=object)[self.j]
+
+def deviation_pct(ctx):
+    sma50 = ctx.indicator('SMA50')
+    return (ctx.bar('Close') - sma50) / sma50 * 100
+
+def rel_vol(ctx):
+    return ctx.bar('Volume') / ctx.indicator('VolSMA50')
+
+# Shared by every strategy, in the order the drops are reported: (counter, needs, test)
+LIQUIDITY_GATE = [
+    ('dropped_price_le_5', [], lambda ctx: ctx.has_bar(1) & ~(ctx.bar('Close') <= 5)),
+    ('dropped_no_sma50', ['SMA50', 'VolSMA50'], lambda ctx: ~np.isnan(ctx.indicator('SMA50')) & ~np.isnan(ctx.indicator('VolSMA50'))),
+    ('dropped_dollar_volume', ['SMA50', 'VolSMA50'], lambda ctx: ~(ctx.indicator('SMA50') * ctx.indicator('VolSMA50') < ctx.min_dollar_volume)),
+]
+
+# STRATEGY 1: SNIPER (Extension > 20%, Rel Vol > 1.2, RSI > 65, bearish pattern)
+SNIPER_PATTERNS = {
+    "Hit Upper BB": lambda ctx: ctx.bar('High') >= ctx.indicator('BB_Upper'),
+    "Bearish Engulfing": lambda ctx: (ctx.bar('Open') > ctx.bar('Close', 1)) & (ctx.bar('Close') < ctx.bar('Open', 1)),
+    "Gap Down": lambda ctx: (ctx.bar('Open') < ctx.bar('Close', 1)) & (ctx.bar('Close') < ctx.bar('Open')),
+}
+
+def sniper_reasons(ctx):
+    hits = {reason: test(ctx) for reason, test in SNIPER_PATTERNS.items()}
+    return [", ".join(reason for reason, hit in hits.items() if hit[n]) for n in range(len(ctx))]
+
+def sniper_results(ctx):
     results_list = []
-    trend_matches = [] 
+    columns = zip(ctx.tickers(), ctx.j, sniper_reasons(ctx), ctx.bar('Close'), ctx.indicator('RSI'),
+                  deviation_pct(ctx), rel_vol(ctx), ctx.date())
+    for ticker, j, reasons, price, rsi, deviation, volume_ratio, date in columns:
+        try:
+            avwap, anchor_date = calculate_anchored_vwap(ticker_frame(ctx.panel, j))
+            results_list.append({
+                'Ticker': ticker,
+                'Category': "Sniper (Bear)",
+                'Signal': reasons,
+                'Price': round(float(price), 2),
+                'AVWAP_Info': f"RSI: {round(rsi)} | Vol: {round(volume_ratio,1)}x",
+                'Details': f"Ext: {deviation:.1f}% | AVWAP: {round(float(avwap),2) if avwap else 'N/A'}",
+                'Date': str(date.date())
+            })
+        except Exception as e:
+            REPORT.error('strategies', e)
+    return results_list
+
+# STRATEGY 2: TREND CROSS (SMA50 crossing SMA200 within the lookback window)
+def cross_masks(sma50, sma200):
+    """Golden/death cross flags for each consecutive pair of rows (row i-1 -> row i)."""
+    with np.errstate(invalid='ignore'):
+        bull = (sma50[:-1] <= sma200[:-1]) & (sma50[1:] > sma200[1:])
+        bear = (sma50[:-1] >= sma200[:-1]) & (sma50[1:] < sma200[1:])
+    return bull, bear
+
+def first_cross(ctx):
+    """(any cross, bars back from the cell to the first one, bullish?) per cell."""
+    bull, bear = cross_masks(ctx.window('SMA50'), ctx.window('SMA200'))
+    in_window = ctx.t - ctx.lookback + np.arange(ctx.lookback)[:, None] >= ctx.first
+    bull &= in_window
+    bear &= in_window
+    crossed = bull | bear
+    k = crossed.argmax(axis=0)
+    return crossed.any(axis=0), ctx.lookback - 1 - k, bull[k, np.arange(len(ctx))]
+
+def trend_cross_matches(ctx):
+    _, back, bullish = first_cross(ctx)
+    dates = ctx.panel['dates'][ctx.panel['rows'][ctx.t - back, ctx.j]]
+    return [{'Ticker': ticker, 'Mode': 'bullish' if bull else 'bearish', 'Price': float(price), 'Date': str(date.date())}
+            for ticker, bull, price, date in zip(ctx.tickers(), bullish, ctx.bar('Close'), dates)]
+
+def trend_replay(ctx):
+    bullish = first_cross(ctx)[2]
+    return {'Category': np.where(bullish, "Bullish Cross", "Bearish Cross"),
+            'Signal': np.where(bullish, "Golden Cross", "Death Cross")}
+
+# Strategies in priority order; a ticker is claimed by the first one that fires. Filters
+# are (name, indicators needed, test) in order of cost and each only runs on the cells the
+# previous ones kept. 'results' turns the survivors into dashboard rows (or, with
+# 'fundamentals', into matches for the fundamentals check); 'replay' labels them for --replay.
+STRATEGIES = [
+    {
+        'name': 'sniper',
+        'filters': [
+            ('stretched', ['SMA50'], lambda ctx: deviation_pct(ctx) > 20),
+            ('heavy_volume', ['VolSMA50'], lambda ctx: rel_vol(ctx) > 1.2),
+            ('extended', ['RSI'], lambda ctx: ctx.indicator('RSI') > 65),
+            ('reversal', ['BB_Upper'], lambda ctx: np.any([test(ctx) for test in SNIPER_PATTERNS.values()], axis=0)),
+        ],
+        'results': sniper_results,
+        'replay': lambda ctx: {'Category': "Sniper (Bear)", 'Signal': sniper_reasons(ctx)},
+    },
+    {
+        'name': 'trend',
+        'filters': [
+            ('crosses', ['SMA50', 'SMA200'], lambda ctx: first_cross(ctx)[0]),
+        ],
+        'results': trend_cross_matches,
+        'fundamentals': True,
+        'replay': trend_replay,
+    },
+]
+
+def run_strategies(ctx, count=False):
+    """
+    One pass over the cells: the liquidity gate, then each strategy's filters in order.
+    Every filter only sees (and only computes indicators for) the cells still alive.
+    Returns {strategy name: context of the cells it fired on}.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for counter, needs, test in LIQUIDITY_GATE:
+            ctx.ind.require(needs, ctx.j)
+            keep = test(ctx)
+            if count: REPORT.count(counter, (~keep).sum())
+            ctx = ctx.select(keep)
+        if count: REPORT.count('passed_liquidity', len(ctx))
+
+        fired = {}
+        for strategy in STRATEGIES:
+            alive, pos = ctx, np.arange(len(ctx))
+            for name, needs, test in strategy['filters']:
+                alive.ind.require(needs, alive.j)
+                keep = test(alive)
+                alive, pos = alive.select(keep), pos[keep]
+                if count: REPORT.count(f"{strategy['name']}_{name}", len(alive))
+            fired[strategy['name']] = alive
+            unclaimed = np.ones(len(ctx), dtype=bool)
+            unclaimed[pos] = False
+            ctx = ctx.select(unclaimed)
+    return fired
+
+def scan_panel(panel, ind=None):
+    """
+    Runs the registered strategies on the latest bar of every column. `ind` may carry
+    indicators already known (the incremental state); the rest are computed on demand.
+    Returns (dashboard results, trend matches for the fundamentals check) in ticker order.
+    """
+    T, N = panel['Close'].shape
+    ind = ind if ind is not None else LazyIndicators(panel)
+    fired = run_strategies(ScanContext(panel, ind, np.full(N, T - 1), np.arange(N)), count=True)
+
+    results_list, trend_matches = [], []
+    for strategy in STRATEGIES:
+        cells = fired[strategy['name']]
+        if not len(cells): continue
+        with np.errstate(invalid='ignore', divide='ignore'):
+            (trend_matches if strategy.get('fundamentals') else results_list).extend(strategy['results'](cells))
+    return results_list, trend_matches
+
+# --- MULTI-TIMEFRAME ---
+# Longer bars built from the daily ones already in the panel (no extra downloads): pandas
+# period alias, trading days per bar (scales the dollar-volume cutoff), lookback in bars
+# and indicator windows. The moving averages use the timeframe's usual equivalents of the
+# daily 50/200 (10/40-week, 3/10-month); the oscillators keep their bar counts, so with a
+# year of history the monthly RSI / Bollinger Band (and thus monthly Sniper) stay NaN.
+TIMEFRAMES = {
+    'W': {'freq': 'W-FRI', 'days': 5, 'lookback': 2,
+          'windows': {'SMA50': 10, 'SMA200': 40, 'VolSMA50': 10, 'RSI': 14, 'BB_Upper': 20}},
+    'M': {'freq': 'M', 'days': 21, 'lookback': 1,
+          'windows': {'SMA50': 3, 'SMA200': 10, 'VolSMA50': 3, 'RSI': 14, 'BB_Upper': 20}},
+}
+
+def resample_panel(panel, freq, cols=None, days=None):
+    """
+    Longer-period bars of columns `cols` in one ufunc.reduceat pass (first Open, max High, min Low,
+    last Close, summed Volume). The current period's bar is partial; given `days`, its volume is pro-rated.
+    """
+    cols = np.arange(len(panel['tickers'])) if cols is None else np.asarray(cols, dtype=int)
+    T, N = len(panel['dates']), len(cols)
+    rows = panel['rows'][:, cols]
+    t, c = np.nonzero(rows >= 0)
+    calendar = {}
+    for field in PRICE_FIELDS:
+        calendar[field] = np.full((T, N), np.nan)
+        calendar[field][rows[t, c], c] = panel[field][t, cols[c]]
+
+    periods = panel['dates'].to_period(freq)
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    valid = ~np.all([np.isnan(calendar[f]) for f in PRICE_FIELDS], axis=0)
+    index = np.arange(T)[:, None]
+    first = np.minimum.reduceat(np.where(valid, index, T - 1), starts, axis=0)
+    last = np.maximum.reduceat(np.where(valid, index, -1), starts, axis=0)
+    columns = np.arange(N)
+
+    bars = {'tickers': [panel['tickers'][j] for j in cols], 'dates': panel['dates'][np.r_[starts[1:], T] - 1]}
+    bars['Open'] = calendar['Open'][first, columns]
+    bars['High'] = np.fmax.reduceat(calendar['High'], starts, axis=0)
+    bars['Low'] = np.fmin.reduceat(calendar['Low'], starts, axis=0)
+    bars['Close'] = calendar['Close'][last, columns]
+    bars['Volume'] = np.add.reduceat(np.nan_to_num(calendar['Volume']), starts, axis=0)
+    if days is not None:
+        # A Monday's weekly bar holds one session; scale it to a full period for the volume filters
+        sessions = valid[starts[-1]:].sum(axis=0)
+        bars['Volume'][-1] *= np.where((sessions > 0) & (sessions < days), days / np.maximum(sessions, 1), 1)
+    for field in PRICE_FIELDS: bars[field][last < 0] = np.nan
+    return right_align(bars)
+
+@REPORT.stage('timeframes')
+def timeframe_agreement(panel, results_list, trend_matches):
+    """
+    Runs the strategies again on weekly / monthly bars of the tickers that fired on the
+    daily ones and lists the timeframes that agree in each signal's 'Timeframes' ("D W").
+    A cross only agrees in the same direction.
+    """
+    signals = [(r, 'sniper', None) for r in results_list] + [(m, 'trend', m['Mode']) for m in trend_matches]
+    for signal, _, _ in signals: signal['Timeframes'] = "D"
+    if not signals or not MULTI_TIMEFRAME: return
+
+    position = {ticker: j for j, ticker in enumerate(panel['tickers'])}
+    cols = sorted({position[signal['Ticker']] for signal, _, _ in signals})
+    for name, tf in TIMEFRAMES.items():
+        bars = resample_panel(panel, tf['freq'], cols, tf['days'])
+        T, N = bars['Close'].shape
+        ind = LazyIndicators(bars, tf['lookback'] + 1, windows=tf['windows'])
+        fired = run_strategies(ScanContext(bars, ind, np.full(N, T - 1), np.arange(N), tf['lookback'],
+                                           MIN_DOLLAR_VOLUME * tf['days']))
+        agree = {(ticker, 'sniper', None) for ticker in fired['sniper'].tickers()}
+        if len(fired['trend']):
+            bullish = first_cross(fired['trend'])[2]
+            agree |= {(ticker, 'trend', 'bullish' if bull else 'bearish')
+                      for ticker, bull in zip(fired['trend'].tickers(), bullish)}
+        for signal, strategy, mode in signals:
+            if (signal['Ticker'], strategy, mode) in agree:
+                signal['Timeframes'] += f" {name}"
+                REPORT.count(f'agree_{name}')
+
+# --- INCREMENTAL INDICATORS ---
+STATE_SUMS = ['sum50', 'sum200', 'vol_sum50', 'bb_sum', 'bb_sumsq', 'gain14', 'loss14']
+_indicator_state = None
+_indicator_state_lock = threading.Lock()
+
+def _load_indicator_state():
+    global _indicator_state
+    if _indicator_state is None:
+        _indicator_state = load_json_cache(INDICATOR_STATE_FILE)
+    return _indicator_state
+
+def save_indicator_state():
+    with _indicator_state_lock:
+        if _indicator_state is None: return
+        save_json_cache(INDICATOR_STATE_FILE, _indicator_state)
+
+def _window_sums(C, V):
+    """Running-sum state rebuilt from the tail of the price arrays (columns = tickers)."""
+    delta = np.diff(C[-15:], axis=0)
+    with np.errstate(invalid='ignore'):
+        return {
+            'sum50': C[-50:].sum(axis=0),
+            'sum200': C[-200:].sum(axis=0),
+            'vol_sum50': V[-50:].sum(axis=0),
+            'bb_sum': C[-20:].sum(axis=0),
+            'bb_sumsq': (C[-20:] ** 2).sum(axis=0),
+            'gain14': np.where(delta > 0, delta, 0).sum(axis=0),
+            'loss14': np.where(delta < 0, -delta, 0).sum(axis=0),
+        }
+
+def _indicators_from_sums(sums):
+    """Latest SMA50 / SMA200 / VolSMA50 / RSI / BB_Upper from running sums."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rs = np.maximum(sums['gain14'], 0) / np.maximum(sums['loss14'], 0)
+        bb_var = np.maximum(sums['bb_sumsq'] - sums['bb_sum'] ** 2 / 20, 0) / 19
+        return {
+            'SMA50': sums['sum50'] / 50,
+            'SMA200': sums['sum200'] / 200,
+            'VolSMA50': sums['vol_sum50'] / 50,
+            'RSI': 100 - (100 / (1 + rs)),
+            'BB_Upper': sums['bb_sum'] / 20 + 2 * np.sqrt(bb_var),
+        }
+
+@REPORT.stage('indicator_state')
+def incremental_indicators(panel):
+    """
+    Latest-bar LazyIndicators advanced in O(1) from persisted running sums; tickers without a
+    trusted state, or due for the drift check, get a full recompute.
+    """
+    tickers, counts = panel['tickers'], panel['counts']
+    # Running sums stay in float64 whatever the panel dtype; only the last 202 bars are read
+    T = len(panel['Close'])
+    C, V = (panel[f][-202:].astype(float) for f in ('Close', 'Volume'))
+    K, N = LOOKBACK_DAYS + 1, len(tickers)
+    ind = LazyIndicators(panel, K)
+    last_dates = [str(panel['dates'][r].date()) if r >= 0 else None for r in panel['rows'][-1]]
+    prev_dates = [str(panel['dates'][r].date()) if r >= 0 else None for r in panel['rows'][-2]]
+
+    with _indicator_state_lock:
+        state = _load_indicator_state()
+        entries = [state.get(t) for t in tickers]
+
+    # Classify: advance one bar / reuse / full recompute
+    step, reuse, due = (np.zeros(N, dtype=bool) for _ in range(3))
+    for j, entry in enumerate(entries):
+        if entry is None or counts[j] < 202: continue
+        if not all(np.isfinite(entry[k]) for k in STATE_SUMS): continue
+        if entry['date'] == last_dates[j] and entry['close'] == C[-1, j]: reuse[j] = True
+        elif entry['date'] == prev_dates[j] and entry['close'] == C[-2, j]: step[j] = True
+        due[j] = entry['updates'] >= INDICATOR_RECOMPUTE_EVERY
+    if T >= 202:
+        touched = [-1, -2, -15, -16, -21, -51, -201]
+        step &= np.isfinite(C[touched]).all(axis=0) & np.isfinite(V[[-1, -51]]).all(axis=0)
+    else:
+        step[:] = False
+    due &= step | reuse
+
+    sums = {k: np.array([e[k] if e is not None else np.nan for e in entries], dtype=float) for k in STATE_SUMS}
+    hist50 = np.array([e['sma50_hist'] if e is not None and step[j] | reuse[j] else [np.nan] * K for j, e in enumerate(entries)]).T
+    hist200 = np.array([e['sma200_hist'] if e is not None and step[j] | reuse[j] else [np.nan] * K for j, e in enumerate(entries)]).T
+
+    # O(1) update: add the new bar, drop the bar leaving each window
+    if step.any():
+        d_new, d_old = C[-1] - C[-2], C[-15] - C[-16]
+        advance = {
+            'sum50': C[-1] - C[-51],
+            'sum200': C[-1] - C[-201],
+            'vol_sum50': V[-1] - V[-51],
+            'bb_sum': C[-1] - C[-21],
+            'bb_sumsq': C[-1] ** 2 - C[-21] ** 2,
+            'gain14': np.maximum(d_new, 0) - np.maximum(d_old, 0),
+            'loss14': np.maximum(-d_new, 0) - np.maximum(-d_old, 0),
+        }
+        for k in STATE_SUMS: sums[k][step] += advance[k][step]
+    latest = _indicators_from_sums(sums)
+    hist50[:, step] = np.vstack([hist50[1:, step], latest['SMA50'][step]])
+    hist200[:, step] = np.vstack([hist200[1:, step], latest['SMA200'][step]])
+    full = ~(step | reuse) | due
+    for name in INDICATORS:
+        values = {'SMA50': hist50, 'SMA200': hist200}.get(name)
+        if values is None:
+            values = np.full((K, N), np.nan)
+            values[-1] = latest[name]
+        ind.provide(name, ~full, values)
+
+    # Full recompute for everything else, plus the periodic drift check
+    ind.require(['SMA50', 'SMA200'], np.flatnonzero(full))
+    if due.any():
+        ind.require(list(INDICATORS), np.flatnonzero(due))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            drift = max(np.nanmax(np.abs(latest[name][due] / ind[name][-1][due] - 1), initial=0) for name in INDICATORS)
+        REPORT.count('indicator_drift_checked', due.sum())
+        if drift > INDICATOR_DRIFT_TOLERANCE:
+            REPORT.count('indicator_drift_exceeded', due.sum())
+    cols = np.flatnonzero(full)
+    if len(cols):
+        rebuilt = _window_sums(C[:, cols], V[:, cols])
+        for k in STATE_SUMS: sums[k][cols] = rebuilt[k]
 
+    REPORT.count('indicators_incremental', (step & ~due).sum())
+    REPORT.count('indicators_reused', (reuse & ~due).sum())
+    REPORT.count('indicators_full', full.sum())
+
+    with _indicator_state_lock:
+        for j, ticker in enumerate(tickers):
+            if counts[j] == 0: continue
+            if full[j]:
+                # Stagger the first check so tickers don't all recompute on the same day
+                updates = 0 if entries[j] is not None else zlib.crc32(ticker.encode()) % INDICATOR_RECOMPUTE_EVERY
+            else:
+                updates = entries[j]['updates'] + int(step[j])
+            state[ticker] = {
+                'date': last_dates[j],
+                'close': float(C[-1, j]),
+                **{k: float(sums[k][j]) for k in STATE_SUMS},
+                'sma50_hist': [float(x) for x in ind['SMA50'][:, j]],
+                'sma200_hist': [float(x) for x in ind['SMA200'][:, j]],
+                'updates': updates,
+            }
+    return ind
+
+# --- PROCESS POOL ---
+def _scan_shard(shm_name, shape, dtype, lo, hi, tickers, dates, counts, ind_state=None):
+    """Worker: evaluates columns lo:hi of a panel whose prices and row map live in shared memory."""
+    REPORT.reset()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        block = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        rows = np.ndarray(shape[1:], dtype=np.intp, buffer=shm.buf, offset=block.nbytes)
+        panel = {'tickers': tickers, 'dates': dates, 'rows': np.array(rows[:, lo:hi]), 'counts': counts}
+        for k, field in enumerate(PRICE_FIELDS): panel[field] = np.array(block[k, :, lo:hi])
+        del block, rows
+    finally:
+        shm.close()
+    ind = LazyIndicators(panel, state=ind_state) if ind_state is not None else None
+    with REPORT.stage('strategies'):
+        results_list, trend_matches = scan_panel(panel, ind)
+    return results_list, trend_matches, REPORT.snapshot()
+
+def scan_panel_parallel(panel, pool, workers, ind=None):
+    """
+    Evaluates the panel's columns on a process pool, with prices and row map in shared memory.
+    Shard results are merged in column order, so the output matches scan_panel exactly.
+    """
+    T, N = panel['Close'].shape
+    shape = (len(PRICE_FIELDS), T, N)
+    dtype = panel['Close'].dtype
+    price_bytes = int(np.prod(shape)) * dtype.itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(1, price_bytes + T * N * np.dtype(np.intp).itemsize))
     try:
-        data = download_data_with_retry(tickers)
-        if data.empty: return []
+        block = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        for k, field in enumerate(PRICE_FIELDS): block[k] = panel[field]
+        rows = np.ndarray((T, N), dtype=np.intp, buffer=shm.buf, offset=price_bytes)
+        rows[:] = panel['rows']
+        del block, rows
+
+        step = max(1, -(-N // workers))
+        futures = [pool.submit(_scan_shard, shm.name, shape, dtype.str, lo, min(lo + step, N), panel['tickers'][lo:lo + step],
+                               panel['dates'], panel['counts'][lo:lo + step],
+                               None if ind is None else ind.state(lo, lo + step))
+                   for lo in range(0, N, step)]
+
+        results_list, trend_matches = [], []
+        for future in futures:
+            shard_results, shard_matches, shard_report = future.result()
+            REPORT.merge(shard_report)
+            results_list.extend(shard_results)
+            trend_matches.extend(shard_matches)
+    finally:
+        shm.close()
+        shm.unlink()
+    return results_list, trend_matches
+
+def create_process_pool(workers):
+    """Spawn-based pool (safe to start from the threaded pipeline), or None for a single process."""
+    if workers <= 1: return None
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+def prepare_panel(data, tickers):
+    """Aligns a downloaded batch into a panel, or None (counted as dropped) when there is nothing to scan."""
+    if data.empty:
+        REPORT.count('dropped_no_data', len(tickers))
+        return None
+    if len(data) < 200:
+        REPORT.count('dropped_short_history', len(tickers))
+        return None
+    return align_price_arrays(data, tickers)
+
+def analyze_panel(panel, tickers, pool=None, workers=1):
+    """Runs the indicator engine on a prepared batch panel. Returns (sniper results, trend matches)."""
+    if panel is None: return [], []
+    update_liquidity_index(panel)
+    has_bars = panel['counts'] >= 2
+    REPORT.count('dropped_no_data', len(tickers) - has_bars.sum())
+    print(f"   Scanning {len(panel['tickers'])} tickers...", flush=True)
+    ind = incremental_indicators(panel) if INCREMENTAL_INDICATORS else None
+    if pool is not None and workers > 1:
+        results_list, trend_matches = scan_panel_parallel(panel, pool, workers, ind)
+    else:
+        with REPORT.stage('strategies'):
+            results_list, trend_matches = scan_panel(panel, ind)
+    timeframe_agreement(panel, results_list, trend_matches)
+    return results_list, trend_matches
+
+async def _check_all(trend_matches):
+    return await asyncio.gather(*(check_fundamentals(item['Ticker'], item['Mode']) for item in trend_matches))
+
+def confirm_trend_matches(trend_matches):
+    """Runs the fundamentals checks concurrently on the HTTP loop and labels each cross Confirmed or Speculative."""
+    results_list = []
+    checks = HTTP.run(_check_all(trend_matches)) if trend_matches else []
+
+    for item, (passed, reason) in zip(trend_matches, checks):
+        try:
+            REPORT.count('fundamentals_confirmed' if passed else 'fundamentals_speculative')
+            cat_label = f"{item['Mode'].capitalize()} (Confirmed)" if passed else f"{item['Mode'].capitalize()} (Speculative)"
 
-        for ticker in tickers:
-            print(f"   Scanning: {ticker:<8}", end='\r', flush=True)
+            results_list.append({
+                'Ticker': item['Ticker'],
+                'Category': cat_label,
+                'Signal': "Golden Cross" if item['Mode']=='bullish' else "Death Cross",
+                'Price': round(item['Price'], 2),
+                'AVWAP_Info': "Trend Setup",
+                'Details': f"Fund: {reason}",
+                'Date': item['Date'],
+                'Timeframes': item.get('Timeframes', "D")
+            })
+        except Exception as e:
+            REPORT.error('fundamentals', e)
+    return results_list
+
+# --- PIPELINE ---
+_DONE = object()
+
+def _stage(source, sink, work):
+    """Consumes items from source until _DONE, pushing work(item) to sink. Never dies on a bad batch."""
+    profiler = None
+    try:
+        profiler = REPORT.start_profiler()
+        while (item := source.get()) is not _DONE:
             try:
-                # 1. PREPARE DATA
-                if len(tickers) > 1:
-                    if ticker not in data.columns.levels[0]: continue
-                    df = data[ticker].copy()
-                else:
-                    df = data.copy()
-
-                if df.empty or len(df) < 200: continue
-                df.dropna(how='all', inplace=True)
-                
-                curr = df.iloc[-1]
-                prev = df.iloc[-2]
-                
-                if curr['Close'] <= 5: continue
-
-                # Indicators
-                df['SMA50'] = get_sma(df['Close'], 50)
-                df['SMA200'] = get_sma(df['Close'], 200)
-                df['VolSMA50'] = get_sma(df['Volume'], 50)
-                df['RSI'] = get_rsi(df['Close'])  # NEW: RSI
-                
-                # Bollinger Bands
-                df['BB_Mid'] = df['Close'].rolling(window=20).mean()
-                df['BB_Std'] = df['Close'].rolling(window=20).std()
-                df['BB_Upper'] = df['BB_Mid'] + (2 * df['BB_Std'])
-
-                sma50_val = df['SMA50'].iloc[-1]
-                vol_sma_val = df['VolSMA50'].iloc[-1]
-                
-                if pd.isna(sma50_val) or pd.isna(vol_sma_val): continue
-                if (sma50_val * vol_sma_val) < 20000000: continue
-
-                # ---------------------------------------------------------
-                # STRATEGY 1: SNIPER (Bearish Mean Reversion)
-                # ---------------------------------------------------------
-                is_sniper = False
-                sniper_reasons = []
-                
-                # Filter 1: Extension (Price > 20% above SMA50)
-                deviation_pct = (curr['Close'] - sma50_val) / sma50_val * 100
-                
-                # Filter 2: NEW RSI Check (> 70 Overbought)
-                rsi_val = df['RSI'].iloc[-1]
-                
-                if deviation_pct > 20 and rsi_val > 65: # Slightly relaxed 65 to catch top
-                    
-                    # Filter 3: High Relative Volume (Selling Pressure)
-                    avg_vol = df['VolSMA50'].iloc[-1]
-                    rel_vol = curr['Volume'] / avg_vol
-                    
-                    if rel_vol > 1.2: # Must be higher than average volume
-                        
-                        # Filter 4: Candle Patterns
-                        if curr['High'] >= df['BB_Upper'].iloc[-1]: sniper_reasons.append("Hit Upper BB")
-                        if (curr['Open'] > prev['Close']) and (curr['Close'] < prev['Open']): sniper_reasons.append("Bearish Engulfing")
-                        if (curr['Open'] < prev['Close']) and (curr['Close'] < curr['Open']): sniper_reasons.append("Gap Down")
-                        
-                        if sniper_reasons:
-                            avwap, anchor_date = calculate_anchored_vwap(df)
-                            is_sniper = True
-                            
-                            results_list.append({
-                                'Ticker': ticker,
-                                'Category': "Sniper (Bear)",
-                                'Signal': ", ".join(sniper_reasons),
-                                'Price': round(curr['Close'], 2),
-                                'AVWAP_Info': f"RSI: {round(rsi_val)} | Vol: {round(rel_vol,1)}x",
-                                'Details': f"Ext: {deviation_pct:.1f}% | AVWAP: {round(avwap,2) if avwap else 'N/A'}",
-                                'Date': str(curr.name.date())
-                            })
-
-                # ---------------------------------------------------------
-                # STRATEGY 2: TREND CROSS
-                # ---------------------------------------------------------
-                if not is_sniper:
-                    subset = df.iloc[-(LOOKBACK_DAYS+1):]
-                    if len(subset) > 2:
-                        sma50_s = subset['SMA50'].values
-                        sma200_s = subset['SMA200'].values
-                        dates = subset.index
-
-                        for i in range(1, len(sma50_s)):
-                            if sma50_s[i-1] <= sma200_s[i-1] and sma50_s[i] > sma200_s[i]:
-                                trend_matches.append({'Ticker': ticker, 'Mode': 'bullish', 'Price': curr['Close'], 'Date': str(dates[i].date())})
-                                break
-                            elif sma50_s[i-1] >= sma200_s[i-1] and sma50_s[i] < sma200_s[i]:
-                                trend_matches.append({'Ticker': ticker, 'Mode': 'bearish', 'Price': curr['Close'], 'Date': str(dates[i].date())})
-                                break
-
-            except Exception: continue
-
-        # --- PROCESS TREND MATCHES ---
-        if trend_matches:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                future_to_item = {executor.submit(check_fundamentals, item['Ticker'], item['Mode']): item for item in trend_matches}
-                
-                for future in concurrent.futures.as_completed(future_to_item):
-                    item = future_to_item[future]
+                sink.put(work(item))
+            except Exception as e:
+                REPORT.error('pipeline', e)
+                print(f"   [Error] Batch {item[0]} failed: {e}")
+    finally:
+        if profiler is not None: profiler.disable()
+        sink.put(_DONE)
+
+def run_pipeline(tickers, workers=1, batch_size=BATCH_SIZE, sink=None, journal=None, cross_section=None):
+    """
+    Scans tickers as threaded fetch -> analyze -> fundamentals stages joined by bounded queues. Results
+    come back in batch order or go to `sink`; batches also go to `journal` and `cross_section`, if given.
+    """
+    batches = [(n, tickers[i : i + batch_size]) for n, i in enumerate(range(0, len(tickers), batch_size))]
+    todo = queue.Queue()
+    fetched, analyzed, confirmed = (queue.Queue(maxsize=PIPELINE_DEPTH) for _ in range(3))
+    for item in batches: todo.put(item)
+    todo.put(_DONE)
+
+    def fetch(item):
+        n, batch = item
+        print(f"\n[Batch {n * batch_size}-{n * batch_size + len(batch)}] Downloading...")
+        data = load_batch_data(batch)
+        present = set(data.columns.get_level_values(0)) if not data.empty else set()
+        return n, batch, prepare_panel(data, batch), [t for t in batch if t not in present]
+
+    pool = create_process_pool(workers)
+    def analyze(item):
+        n, batch, panel, missing = item
+        return (n, missing, ranking_features(panel), *analyze_panel(panel, batch, pool, workers))
+
+    def fundamentals(item):
+        n, missing, features, results_list, trend_matches = item
+        return n, missing, features, results_list + confirm_trend_matches(trend_matches)
+
+    stages = [threading.Thread(target=_stage, args=args, daemon=True) for args in
+               ((todo, fetched, fetch), (fetched, analyzed, analyze), (analyzed, confirmed, fundamentals))]
+    for stage in stages: stage.start()
+
+    by_batch = {}
+    while (item := confirmed.get()) is not _DONE:
+        n, missing, features, results_list = item
+        if journal is not None: journal.record(batches[n][1], missing, results_list, features)
+        if cross_section is not None: cross_section.add(*features)
+        if sink is not None: sink.write(results_list)
+        else: by_batch[n] = results_list
+    for stage in stages: stage.join()
+    if pool is not None: pool.shutdown()
+    save_fundamentals_cache()
+    save_liquidity_index()
+    save_indicator_state()
+    return [r for n in sorted(by_batch) for r in by_batch[n]]
+
+# --- CROSS-SECTIONAL RANKS ---
+RS_HORIZONS = {'3M': 63, '6M': 126, '12M': 245}   # Bars back; the 1y store holds ~248-252 sessions, so 12M stays inside it
+RS_WEIGHTS = {'3M': 2, '6M': 1, '12M': 1}          # Composite RS score over the horizons a ticker has, latest quarter double-weighted
+RANK_FEATURES = [f'Ret_{h}' for h in RS_HORIZONS] + ['RelVol', 'Ext_SMA50']
+
+def ranking_features(panel):
+    """(tickers, tickers x RANK_FEATURES array) at the latest bar of the liquid columns, NaN where history is too short."""
+    if panel is None: return [], np.empty((0, len(RANK_FEATURES)))
+    C, V = (panel[f][-max(RS_HORIZONS.values()) - 1:].astype(float) for f in ('Close', 'Volume'))
+    T, N = C.shape
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = [C[-1] / C[-1 - h] - 1 if T > h else np.full(N, np.nan) for h in RS_HORIZONS.values()]
+        sma50, volume_sma50 = C[-50:].mean(axis=0), V[-50:].mean(axis=0)
+        rel_volume = V[-1] / volume_sma50
+        extension = C[-1] / sma50 - 1
+        # Ranked universe: the liquidity gate, which no prefilter-skipped ticker can pass on its re-validation day
+        liquid = (T >= 2) & (C[-1] > 5) & (sma50 * volume_sma50 >= MIN_DOLLAR_VOLUME)
+    tickers = [t for t, keep in zip(panel['tickers'], liquid) if keep]
+    return tickers, np.column_stack([*returns, rel_volume, extension])[liquid]
+
+def percentile_ranks(values, points):
+    """
+    Percentile (0-99) of each point among values, NaN where either is missing. The 99 cut
+    points come from one np.percentile call, which partitions rather than sorts.
+    """
+    known = values[~np.isnan(values)]
+    if not len(known): return np.full(len(points), np.nan)
+    ranks = np.searchsorted(np.percentile(known, np.arange(1, 100)), points, side='right').astype(float)
+    ranks[np.isnan(points)] = np.nan
+    return ranks
+
+def top_k(values, k=RANK_TOP_K):
+    """{position: rank} of the k largest values: argpartition picks them, only those k get sorted."""
+    known = np.flatnonzero(~np.isnan(values))
+    k = min(k, len(known))
+    if not k: return {}
+    top = known[np.argpartition(-values[known], k - 1)[:k]]
+    return {int(i): n + 1 for n, i in enumerate(top[np.argsort(-values[top], kind='stable')])}
+
+class CrossSection:
+    """
+    Ranking features of every scanned ticker, gathered batch by batch (and restored from
+    the journal or shard partials). rank() places each result within the whole universe.
+    """
+    def __init__(self):
+        self.tickers, self.blocks = [], []
+
+    def add(self, tickers, values):
+        self.tickers.extend(tickers)
+        self.blocks.append(np.asarray(values, dtype=float).reshape(-1, len(RANK_FEATURES)))
+
+    @staticmethod
+    def encode(tickers, values):
+        """JSON-ready form of one batch's features, for the journal and shard partials."""
+        return {'tickers': list(tickers), 'values': np.round(values, 6).tolist()}
+
+    def values(self):
+        return np.concatenate(self.blocks) if self.blocks else np.empty((0, len(RANK_FEATURES)))
+
+    @REPORT.stage('ranks')
+    def rank(self, results):
+        """
+        Adds to each result (in place) its universe percentiles: RS (composite of the
+        RS_HORIZONS returns a ticker has) and RS_3M / RS_6M / RS_12M, RelVol_Pct and Ext_Pct
+        (close over SMA50), plus RS_Top / Ext_Top for tickers among the RANK_TOP_K leaders.
+        """
+        if not results: return
+        position = {ticker: i for i, ticker in enumerate(self.tickers)}   # The last batch wins on repeats
+        values = self.values()[np.fromiter(position.values(), dtype=int, count=len(position))]
+        returns = values[:, :len(RS_HORIZONS)]
+        weights = ~np.isnan(returns) * np.array([RS_WEIGHTS[h] for h in RS_HORIZONS], dtype=float)
+        with np.errstate(invalid='ignore'):
+            score = np.nansum(returns * weights, axis=1) / weights.sum(axis=1)
+        columns = {'RS': score, **{f'RS_{h}': values[:, k] for k, h in enumerate(RS_HORIZONS)},
+                   'RelVol_Pct': values[:, -2], 'Ext_Pct': values[:, -1]}
+
+        row = {ticker: n for n, ticker in enumerate(position)}
+        rows = np.array([row.get(r['Ticker'], -1) for r in results])
+        found = rows >= 0
+        ranks = {}
+        for name, column in columns.items():
+            ranks[name] = np.full(len(results), np.nan)
+            ranks[name][found] = percentile_ranks(column, column[rows[found]])
+        leaders = {'RS_Top': top_k(score), 'Ext_Top': top_k(values[:, -1])}
+
+        for n, r in enumerate(results):
+            for name in columns: r[name] = None if np.isnan(ranks[name][n]) else int(ranks[name][n])
+            for name, top in leaders.items(): r[name] = top.get(int(rows[n])) if found[n] else None
+        REPORT.count('ranked_universe', len(values))
+
+    def rank_file(self, path):
+        """rank() for the results of a ResultSink file, rewritten in place."""
+        with open(path, encoding="utf-8") as f:
+            results = [json.loads(line) for line in f if line.strip()]
+        self.rank(results)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r) + "\n" for r in results)
+        os.replace(tmp_path, path)
+
+# --- STREAMING ---
+def peak_rss_mb(children=False):
+    """Peak resident set size in MB of this process, or of the largest child process it waited for."""
+    import resource
+    scale = 1 if sys.platform == 'darwin' else 1024   # ru_maxrss is bytes on macOS, KiB on Linux
+    return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+def rss_mb():
+    """Current resident set size in MB (the peak, where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+def auto_batch_size(memory_mb):
+    """
+    Largest batch whose in-flight prices fit what is left of memory_mb: PIPELINE_DEPTH
+    queued panels plus the one being fetched and the one being analyzed, each held up to
+    PANEL_COPIES times at its peak.
+    """
+    bars = HISTORY_DAYS * 252 // 365 + 1
+    per_ticker = bars * len(PRICE_FIELDS) * np.dtype(PRICE_DTYPE).itemsize * PANEL_COPIES * (PIPELINE_DEPTH + 2)
+    available = max(0.0, memory_mb - rss_mb()) * 2**20
+    return int(np.clip(available // per_ticker, *STREAM_BATCH_LIMITS))
+
+class ResultSink:
+    """Appends each batch's results to a JSONL file as it completes, so nothing accumulates in memory."""
+    def __init__(self, path):
+        self.path = path
+        self.categories = collections.Counter()
+        open(path, "w", encoding="utf-8").close()
+
+    def write(self, results_list):
+        if not results_list: return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(pd.DataFrame(results_list).to_json(orient='records', lines=True))
+        self.categories.update(r['Category'] for r in results_list)
+
+# --- RUN JOURNAL ---
+class RunJournal:
+    """Append-only, fsynced record of one scan: a header with its scope, then a line per completed batch."""
+    def __init__(self, path=None):
+        self.path = path or JOURNAL_FILE
+
+    def _append(self, record):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start(self, scope):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        open(self.path, "w", encoding="utf-8").close()
+        self._append({**scope, 'started': datetime.datetime.now().isoformat(timespec='seconds')})
+
+    def record(self, tickers, missing, results_list, features=None):
+        record = {'tickers': list(tickers), 'missing': missing, 'results': results_list}
+        if features is not None: record['features'] = CrossSection.encode(*features)
+        self._append(record)
+
+    def load(self, scope):
+        """(scanned tickers, tickers still without data, results, CrossSection) if the journal matches scope, else None."""
+        records = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
                     try:
-                        passed, reason = future.result()
-                        cat_label = f"{item['Mode'].capitalize()} (Confirmed)" if passed else f"{item['Mode'].capitalize()} (Speculative)"
-                        
-                        results_list.append({
-                            'Ticker': item['Ticker'],
-                            'Category': cat_label,
-                            'Signal': "Golden Cross" if item['Mode']=='bullish' else "Death Cross",
-                            'Price': round(item['Price'], 2),
-                            'AVWAP_Info': "Trend Setup",
-                            'Details': f"Fund: {reason}",
-                            'Date': item['Date']
-                        })
-                    except Exception: continue
-
-    except Exception: pass
-    return results_list
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break   # Torn last line of a killed run
+        except OSError:
+            return None
+        if not records or any(records[0].get(key) != value for key, value in scope.items()): return None
+
+        scanned, missing, results, cross_section = set(), set(), [], CrossSection()
+        for record in records[1:]:
+            scanned.update(record['tickers'])
+            missing.difference_update(record['tickers'])
+            missing.update(record['missing'])
+            results.extend(record['results'])
+            if 'features' in record: cross_section.add(record['features']['tickers'], record['features']['values'])
+        return scanned, missing, results, cross_section
+
+# --- SHARDING ---
+def shard_of(ticker, shards):
+    """
+    Jump consistent hash of the ticker (Lamping & Veach): the same shard every day, and
+    growing `shards` from N to N+1 moves only ~1/(N+1) of the tickers.
+    """
+    key, b, j = zlib.crc32(ticker.encode()), -1, 0
+    while j < shards:
+        b = j
+        key = (key * 2862933555777941757 + 1) % 2**64
+        j = int((b + 1) * (2**31 / ((key >> 33) + 1)))
+    return b
+
+def select_shard(tickers, index, shards):
+    return [t for t in tickers if shard_of(t, shards) == index]
+
+def shard_path(index, shards):
+    return _report_path(SHARD_FILENAME.format(index=index, shards=shards))
+
+def use_shard(index, shards):
+    """Points the whole-file caches and the run report at this shard's own files; the price store stays shared."""
+    global CACHE_DIR, FUNDAMENTALS_FILE, LIQUIDITY_FILE, INDICATOR_STATE_FILE, JOURNAL_FILE
+    global REPORT_FILENAME, PROFILE_FILENAME
+    CACHE_DIR = os.path.join(CACHE_DIR, f"shard-{index}")
+    FUNDAMENTALS_FILE = os.path.join(CACHE_DIR, os.path.basename(FUNDAMENTALS_FILE))
+    LIQUIDITY_FILE = os.path.join(CACHE_DIR, os.path.basename(LIQUIDITY_FILE))
+    INDICATOR_STATE_FILE = os.path.join(CACHE_DIR, os.path.basename(INDICATOR_STATE_FILE))
+    JOURNAL_FILE = os.path.join(CACHE_DIR, os.path.basename(JOURNAL_FILE))
+    suffix = f".shard-{index}-of-{shards}"
+    REPORT_FILENAME = suffix.join(os.path.splitext(REPORT_FILENAME))
+    PROFILE_FILENAME = suffix.join(os.path.splitext(PROFILE_FILENAME))
+
+class ShardSink(ResultSink):
+    """ResultSink for one shard's partial, kept under a temp name until close() so a dead shard leaves none."""
+    def __init__(self, index, shards, snapshot, tickers):
+        self.final_path = shard_path(index, shards)
+        super().__init__(self.final_path + ".tmp")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({'shard': index, 'shards': shards, 'snapshot': snapshot, 'tickers': tickers}) + "\n")
+
+    def close(self, cross_section=None):
+        """Appends the shard's ranking features (so the merge can rank across shards) and publishes the partial."""
+        if cross_section is not None:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({'features': CrossSection.encode(cross_section.tickers, cross_section.values())}) + "\n")
+        os.replace(self.path, self.final_path)
+        self.path = self.final_path
+
+def merge_partials(paths):
+    """
+    Shard partials of the newest snapshot as one result list, de-duplicated and ordered on
+    (Category, Ticker) and ranked across shards. None if a shard is missing.
+    """
+    partials = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            lines = [json.loads(line) for line in f if line.strip()]
+        header['features'] = [line['features'] for line in lines if 'features' in line]
+        header['path'] = path
+        partials.append((header, [line for line in lines if 'features' not in line]))
+    if not partials:
+        print("[Error] No shard partials to merge.")
+        return None
+
+    snapshot = max(header['snapshot'] for header, _ in partials)
+    stale = sum(header['snapshot'] != snapshot for header, _ in partials)
+    if stale: print(f"Ignoring {stale} partials older than the {snapshot} snapshot")
+    partials = sorted((p for p in partials if p[0]['snapshot'] == snapshot), key=lambda p: p[0]['shard'])
+    counts = {header['shards'] for header, _ in partials}
+    if len(counts) > 1:
+        print(f"[Error] Partials of the {snapshot} snapshot mix shard counts {sorted(counts)}.")
+        return None
+    shards = counts.pop()
+    missing = sorted(set(range(shards)) - {header['shard'] for header, _ in partials})
+    if missing:
+        print(f"[Error] Missing shards {missing} of {shards} for the {snapshot} snapshot.")
+        return None
+    fold_shard_reports([header for header, _ in partials])
+
+    rows, cross_section = {}, CrossSection()
+    for header, results in partials:
+        for r in results: rows.setdefault((r['Category'], r['Ticker']), r)
+        for features in header['features']: cross_section.add(features['tickers'], features['values'])
+    REPORT.count('merged_duplicates', sum(len(results) for _, results in partials) - len(rows))
+    print(f"Merged {shards} shards of the {snapshot} snapshot: "
+          f"{sum(header['tickers'] for header, _ in partials)} tickers, {len(rows)} results")
+    merged = [rows[k] for k in sorted(rows)]
+    cross_section.rank(merged)
+    return merged
+
+def fold_shard_reports(headers):
+    """Adds the run report each shard wrote (found next to its partial) into REPORT and the cache stats."""
+    found = 0
+    for header in headers:
+        name = f".shard-{header['shard']}-of-{header['shards']}".join(os.path.splitext(REPORT_FILENAME))
+        try:
+            with open(os.path.join(os.path.dirname(header['path']), name), encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        REPORT.merge(report)
+        for stats, key in ((STORE_STATS, 'price_store'), (FUNDAMENTALS_STATS, 'fundamentals_cache')):
+            for k, v in report.get(key, {}).items(): stats[k] = stats.get(k, 0) + v
+        found += 1
+    REPORT.count('shard_reports', found)
+    if found < len(headers): print(f"Run report: only {found} of {len(headers)} shard reports found next to the partials")
+
+def launch_shards(shards, choice, args):
+    """
+    Runs every shard as its own subprocess of this script (stdout to a per-shard log next
+    to the dashboard) and merges their partials. Returns the merged results, or None.
+    """
+    flags = ['--workers', str(args.workers), '--memory-mb', str(args.memory_mb)]
+    flags += [flag for flag, on in (('--full-sweep', args.full_sweep), ('--full-recompute', args.full_recompute),
+                                    ('--stream', args.stream), ('--resume', args.resume)) if on]
+    procs = []
+    for index in range(shards):
+        log = open(_report_path(f"shard-{index}-of-{shards}.log"), "w", encoding="utf-8")
+        cmd = [sys.executable, os.path.abspath(__file__), *flags, '--shard', f"{index}/{shards}"]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=log, stderr=subprocess.STDOUT, text=True)
+        proc.stdin.write(choice + "\n")
+        proc.stdin.close()
+        procs.append((index, proc, log))
+    print(f"Launched {shards} shards, logs: {_report_path(f'shard-*-of-{shards}.log')}")
 
-def generate_dashboard_file(df):
+    failed = []
+    for index, proc, log in procs:
+        if proc.wait() != 0: failed.append(index)
+        log.close()
+    if failed:
+        print(f"[Error] Shards {failed} failed, see their logs.")
+        return None
+    return merge_partials([shard_path(index, shards) for index in range(shards)])
+
+# --- REPLAY ---
+def replay_panel(panel, min_dollar_volume=MIN_DOLLAR_VOLUME):
+    """
+    Runs the strategies on every bar in one pass, without look-ahead or fundamentals; crosses count on
+    the day they happen. Returns one row per signal with forward returns (%).
+    """
+    T, N = panel['Close'].shape
+    ind = LazyIndicators(panel, rows=T)
+    t, j = (a.ravel() for a in np.meshgrid(np.arange(1, T), np.arange(N), indexing='ij'))
+    fired = run_strategies(ScanContext(panel, ind, t, j, lookback=1, min_dollar_volume=min_dollar_volume))
+
+    close = panel['Close']
+    forward = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for days in FORWARD_DAYS:
+            fwd = np.full(close.shape, np.nan)
+            if days < len(close): fwd[:-days] = (close[days:] / close[:-days] - 1) * 100
+            forward[f'Fwd_{days}d'] = fwd
+
+    frames = []
+    for strategy in STRATEGIES:
+        cells = fired[strategy['name']]
+        if not len(cells): continue
+        ind.require(['SMA50', 'VolSMA50', 'RSI'], cells.j)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frames.append(pd.DataFrame({
+                'Date': cells.date(),
+                'Ticker': cells.tickers(),
+                **strategy['replay'](cells),
+                'Price': cells.bar('Close').round(2),
+                'RSI': cells.indicator('RSI').round(1),
+                'Ext': deviation_pct(cells).round(1),
+                'RelVol': rel_vol(cells).round(2),
+                'DollarVol': (cells.indicator('SMA50') * cells.indicator('VolSMA50')).round(0),
+                **{name: fwd[cells.t, cells.j].round(2) for name, fwd in forward.items()},
+            }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def summarize_replay(history):
+    """Signal count, mean forward return and hit rate (move in the signal's direction) per category."""
+    cols = [f'Fwd_{days}d' for days in FORWARD_DAYS]
+    direction = np.where(history['Category'] == "Bullish Cross", 1, -1)
+    moves = history[cols].mul(direction, axis=0)
+    hits = (moves > 0).astype(float).where(moves.notna())
+    by_cat = history.groupby('Category')
+    summary = by_cat[cols].mean().round(2)
+    summary.insert(0, 'Signals', by_cat.size())
+    for col in cols:
+        summary[f'Hit_{col[4:]}'] = hits[col].groupby(history['Category']).mean().mul(100).round(1)
+    return summary
+
+def run_replay(tickers, min_dollar_volume=MIN_DOLLAR_VOLUME):
+    """Replays the strategies over the stored history of every ticker and writes REPLAY_FILENAME."""
+    frames = []
+    for i in range(0, len(tickers), BATCH_SIZE):
+        batch = tickers[i : i + BATCH_SIZE]
+        print(f"\n[Replay {i}-{i + len(batch)}] Loading...")
+        data = load_batch_data(batch)
+        if data.empty or len(data) < 2: continue
+        panel = align_price_arrays(data, batch)
+        frames.append(replay_panel(panel, min_dollar_volume))
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        print("No signals in the stored history.")
+        return
+    history = pd.concat(frames, ignore_index=True).sort_values(['Date', 'Ticker'], kind='stable')
+    history.to_csv(REPLAY_FILENAME, index=False)
+    print(f"\n[SUCCESS] Signal history written: {REPLAY_FILENAME} ({len(history)} signals)")
+    print(summarize_replay(history).to_string())
+
+def dashboard_payload(df):
+    """
+    Columnar results (DICTIONARY_COLUMNS as values + codes, null for missing) plus the category,
+    timeframe and ticker-prefix indexes the page filters with.
+    """
+    if df.empty: df = pd.DataFrame(columns=['Ticker', 'Category'])   # No setups: empty columns and indexes
+    columns = {}
+    for name in df.columns:
+        col = df[name]
+        if name in DICTIONARY_COLUMNS:
+            codes, values = pd.factorize(col)
+            columns[name] = {'values': list(values), 'codes': codes.tolist()}
+        elif pd.api.types.is_numeric_dtype(col):
+            values = col.to_numpy(dtype=float)
+            missing = np.isnan(values)
+            integral = np.all(missing | (values == np.round(values)))
+            values = (np.where(missing, 0, values).astype(np.int64) if integral else values).astype(object)
+            values[missing] = None
+            columns[name] = values.tolist()
+        else:
+            columns[name] = col.astype(object).where(col.notna(), None).tolist()
+
+    category = columns['Category']
+    codes = np.asarray(category['codes'])
+    timeframes = df['Timeframes'].fillna("D").str.split() if 'Timeframes' in df else pd.Series([["D"]] * len(df))
+    tickers = df['Ticker'].astype(str).to_numpy()
+    order = np.argsort(tickers, kind='stable')
+    prefix = {}
+    for length in (1, 2):
+        keys = pd.Series(tickers[order]).str[:length]
+        starts = np.flatnonzero(~keys.duplicated().to_numpy())
+        for start, end in zip(starts, np.r_[starts[1:], len(keys)]):
+            key = keys.iloc[start]
+            if len(key) == length: prefix[key] = [int(start), int(end)]   # "A" is a 1-character prefix only
+
+    return {
+        'rows': len(df),
+        'columns': columns,
+        'index': {
+            'category': {value: np.flatnonzero(codes == k).tolist() for k, value in enumerate(category['values'])},
+            'timeframe': {tf: np.flatnonzero(timeframes.map(lambda agreeing: tf in agreeing).to_numpy()).tolist()
+                          for tf in TIMEFRAMES},
+            'order': order.tolist(),
+            'prefix': prefix,
+        },
+    }
+
+@REPORT.stage('dashboard')
+def generate_dashboard_file(results):
+    """
+    results is a DataFrame or the path of a ResultSink file. The page shell goes to
+    OUTPUT_FILENAME and the gzipped dashboard_payload to DATA_FILENAME next to it; the page
+    fetches the payload and renders DASHBOARD_PAGE_SIZE rows at a time.
+    """
     timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    json_data = df.to_json(orient='records')
-    html_content = HTML_TEMPLATE.replace("/* DATA_PLACEHOLDER */", json_data)
+    if not isinstance(results, pd.DataFrame):
+        with open(results, encoding="utf-8") as f:
+            results = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    payload = json.dumps(dashboard_payload(results), separators=(',', ':'), allow_nan=False)
+    data_path = _report_path(DATA_FILENAME)
+    with open(data_path + ".tmp", "wb") as f:
+        f.write(gzip.compress(payload.encode("utf-8"), compresslevel=6, mtime=0))
+    os.replace(data_path + ".tmp", data_path)
+
+    html_content = HTML_TEMPLATE.replace("/* DATA_URL_PLACEHOLDER */", f"{DATA_FILENAME}?v={urllib.parse.quote(timestamp)}")
     html_content = html_content.replace("/* DATE_PLACEHOLDER */", timestamp)
+    html_content = html_content.replace("/* PAGE_SIZE_PLACEHOLDER */", str(DASHBOARD_PAGE_SIZE))
     
-    with open(OUTPUT_FILENAME, "w", encoding="utf-8") as f:
+    tmp_path = OUTPUT_FILENAME + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         f.write(html_content)
+    os.replace(tmp_path, OUTPUT_FILENAME)
     print(f"\n[SUCCESS] Dashboard generated: {OUTPUT_FILENAME}")
 
+def shard_spec(value):
+    """argparse type for --shard: 'I/N' -> (I, N)."""
+    index, _, shards = value.partition('/')
+    try:
+        index, shards = int(index), int(shards)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {value!r}")
+    if not 0 <= index < shards: raise argparse.ArgumentTypeError(f"shard index must be in 0..{shards - 1}")
+    return index, shards
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Market Sniper & Trend Cross scanner")
+    parser.add_argument('--workers', type=int, default=1, help="processes used for strategy evaluation (default: 1)")
+    parser.add_argument('--replay', action='store_true', help="evaluate the strategies on every stored date and write a signal history")
+    parser.add_argument('--min-dollar-volume', type=float, default=MIN_DOLLAR_VOLUME, help="liquidity cutoff used by --replay")
+    parser.add_argument('--full-sweep', action='store_true', help="ignore the liquidity index and download every ticker")
+    parser.add_argument('--full-recompute', action='store_true', help="recompute every indicator from scratch (ignore the incremental state)")
+    parser.add_argument('--profile', action='store_true', help=f"run under cProfile and write {PROFILE_FILENAME}")
+    parser.add_argument('--stream', action='store_true', help=f"memory-bounded scan: float32 prices, automatic batch size, results streamed to {RESULTS_FILENAME}")
+    parser.add_argument('--resume', action='store_true', help="continue the last scan of the same data snapshot: skip completed batches, retry tickers that returned no data")
+    parser.add_argument('--memory-mb', type=float, default=STREAM_MEMORY_MB, help=f"memory budget for --stream (default: {STREAM_MEMORY_MB})")
+    parser.add_argument('--shard', type=shard_spec, metavar='I/N', help=f"scan only shard I of N of the universe and write the partial {SHARD_FILENAME}")
+    parser.add_argument('--shards', type=int, metavar='N', help="run all N shards as subprocesses, then merge them into the dashboard")
+    parser.add_argument('--merge', nargs='*', metavar='PARTIAL', help="build the dashboard from shard partials (default: every partial next to it)")
+    return parser.parse_args()
+
+def print_summary(categories):
+    print("Summary:")
+    print(pd.Series(categories).rename_axis('Category').sort_values(ascending=False, kind='stable').to_string())
+
+def publish_merged(merged):
+    """Dashboard and summary for merged shard results (the dashboard is written even when empty)."""
+    categories = collections.Counter(r['Category'] for r in merged)
+    generate_dashboard_file(pd.DataFrame(merged))
+    if categories: print_summary(categories)
+    else: print("No setups found today.")
+
 def main():
+    args = parse_args()
+    global INCREMENTAL_INDICATORS, PRICE_DTYPE
+    if args.full_recompute: INCREMENTAL_INDICATORS = False
+    if args.stream: PRICE_DTYPE = np.float32
+    if args.shard: use_shard(*args.shard)
+    if args.profile:
+        REPORT.profilers = []
+        REPORT.start_profiler()
+
+    if args.merge is not None:
+        paths = args.merge or sorted(glob.glob(_report_path(SHARD_FILENAME.format(index='*', shards='*'))))
+        merged = merge_partials(paths)
+        if merged is None: sys.exit(1)
+        publish_merged(merged)
+        write_run_report(mode='merge', partials=len(paths))
+        return
+
     print("1. S&P 500\n2. NASDAQ Composite (Auto)\n3. Test List")
     c = input("Select: ").strip()
     if c=='1': tickers = get_sp500_tickers()
@@ -441,23 +2148,80 @@ def main():
     
     if not tickers: return
 
+    if args.shards:
+        merged = launch_shards(args.shards, c, args)
+        if merged is None: sys.exit(1)
+        publish_merged(merged)
+        write_run_report(mode='shards', shards=args.shards)
+        return
+
+    if args.replay:
+        print(f"\n--- Replaying {len(tickers)} Stocks ---")
+        run_replay(tickers, args.min_dollar_volume)
+        write_run_report(mode='replay', tickers=len(tickers))
+        return
+
+    if args.shard:
+        tickers = select_shard(tickers, *args.shard)
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(tickers)} tickers")
+    universe = len(tickers)
+
+    journal = RunJournal()
+    snapshot = str(expected_last_session().date())
+    # A journal only resumes the same scan: same data snapshot, universe and shard
+    scope = {'snapshot': snapshot, 'universe': {'1': 'sp500', '2': 'nasdaq'}.get(c, 'test'),
+             'shard': "{}/{}".format(*args.shard) if args.shard else None}
+    resumed = journal.load(scope) if args.resume else None
+    missing = set()
+    if resumed is None:
+        if args.resume: print(f"No journal of this scan for the {snapshot} snapshot, starting a full scan.")
+        journal.start(scope)
+        kept, cross_section = [], CrossSection()
+    else:
+        scanned, missing, kept, cross_section = resumed
+        current = set(tickers)
+        kept = [r for r in kept if r['Ticker'] in current]
+        tickers = [t for t in tickers if t not in scanned or t in missing]
+        print(f"Resuming the {snapshot} scan: {len(scanned) - len(missing)} tickers done ({len(kept)} results), "
+              f"{len(tickers)} left ({len(missing)} retried)")
+        REPORT.count('resumed_results', len(kept))
+    # Tickers the journal retries are exempt: an empty download says nothing about liquidity
+    if not args.full_sweep: tickers = prefilter_liquidity(tickers, exempt=missing)
+
     print(f"\n--- Scanning {len(tickers)} Stocks (Dual Engine) ---")
-    all_results = []
-    
-    for i in range(0, len(tickers), BATCH_SIZE):
-        batch = tickers[i : i + BATCH_SIZE]
-        print(f"\n[Batch {i}-{min(i+BATCH_SIZE, len(tickers))}] Processing...")
-        res = analyze_batch(batch)
-        all_results.extend(res)
-        if i + BATCH_SIZE < len(tickers): time.sleep(SLEEP_TIME)
-
-    if all_results:
-        df = pd.DataFrame(all_results)
-        generate_dashboard_file(df)
-        print("Summary:")
-        print(df['Category'].value_counts().to_string())
+    batch_size = BATCH_SIZE
+    if args.stream:
+        batch_size = auto_batch_size(args.memory_mb)
+        print(f"Streaming {batch_size} tickers per batch ({args.memory_mb:.0f} MB budget)")
+    if args.stream or args.shard:
+        sink = ShardSink(*args.shard, snapshot, universe) if args.shard else ResultSink(_report_path(RESULTS_FILENAME))
+        sink.write(kept)
+        run_pipeline(tickers, workers=args.workers, batch_size=batch_size, sink=sink, journal=journal, cross_section=cross_section)
+        if not args.shard: cross_section.rank_file(sink.path)
+        results, categories = sink.path, sink.categories
+    else:
+        all_results = kept + run_pipeline(tickers, workers=args.workers, journal=journal, cross_section=cross_section)
+        cross_section.rank(all_results)
+        results, categories = pd.DataFrame(all_results), collections.Counter(r['Category'] for r in all_results)
+
+    if args.shard:
+        sink.close(cross_section)
+        print(f"\n[SUCCESS] Shard partial written: {sink.path}")
+        if categories: print_summary(categories)
+    elif categories:
+        generate_dashboard_file(results)
+        print_summary(categories)
     else:
         print("No setups found today.")
+    print(f"Price store: {STORE_STATS['hit']} hit | {STORE_STATS['delta']} delta | {STORE_STATS['full']} full "
+          f"({STORE_STATS['readjusted']} re-adjusted) | {STORE_STATS['failed']} failed")
+    print(f"Fundamentals cache: {FUNDAMENTALS_STATS['hit']} hit | {FUNDAMENTALS_STATS['miss']} miss")
+    REPORT.count('tickers_requested', len(tickers))
+    REPORT.count('signals', sum(categories.values()))
+    write_run_report(mode='scan', tickers=len(tickers), workers=args.workers)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        HTTP.close()
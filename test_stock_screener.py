@@ -0,0 +1,18 @@
+"""
+Unit checks for stock_screener that need no network or price data. Run with `python -m pytest`.
+"""
+import pandas as pd
+
+import stock_screener
+
+def test_prefix_index_covers_tickers_that_prefix_each_other():
+    tickers = ['AB', 'AAPL', 'A', 'AA', 'CAT', 'C', 'T']
+    index = stock_screener.dashboard_payload(pd.DataFrame({'Ticker': tickers, 'Category': "Sniper (Bear)"}))['index']
+    ordered = [tickers[i] for i in index['order']]
+    expected = {t[:n]: sorted(u for u in tickers if u.startswith(t[:n])) for t in tickers for n in (1, 2) if len(t) >= n}
+    assert {key: ordered[lo:hi] for key, (lo, hi) in index['prefix'].items()} == expected
+
+def test_empty_results_give_an_empty_payload():
+    payload = stock_screener.dashboard_payload(pd.DataFrame([]))
+    assert payload['rows'] == 0
+    assert payload['index']['order'] == [] and payload['index']['prefix'] == {}